@@ -0,0 +1,71 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+
+class PasswordHasher:
+    """
+    bcrypt hashing off the event loop. Calls run on a small thread pool
+    (bcrypt releases the GIL) and at most max_concurrency run at once;
+    the rest wait, which is reported as the queue depth.
+    """
+    def __init__(self, rounds: int = None, max_concurrency: int = None):
+        self.rounds = rounds or int(os.getenv("BCRYPT_ROUNDS", "12"))
+        self.max_concurrency = max_concurrency or int(os.getenv("BCRYPT_MAX_CONCURRENCY", "4"))
+        # hashes made with other rounds verify fine but are reported as needing an update
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=self.rounds)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="bcrypt")
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.waiting = 0
+        self.running = 0
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    async def _run(self, func, *args):
+        started = time.monotonic()
+        acquired = False
+        self.waiting += 1
+        try:
+            async with self._semaphore:
+                self.waiting -= 1
+                acquired = True
+                self.running += 1
+                try:
+                    return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+                finally:
+                    self.running -= 1
+        finally:
+            if not acquired:
+                self.waiting -= 1
+            elapsed = time.monotonic() - started
+            self.calls += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, str | None]:
+        """Verify, and return a fresh hash as well when the stored one uses other rounds"""
+        return await self._run(self.context.verify_and_update, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.waiting,
+            "running": self.running,
+            "calls": self.calls,
+            "avg_seconds": self.total_seconds / self.calls if self.calls else 0.0,
+            "max_seconds": self.max_seconds
+        }
+
+
+# shared by every service of the process
+password_hasher = PasswordHasher()
@@ -1,15 +1,105 @@
+import asyncio
+import json
+import re
+import time
+from functools import partial
 from backend.core.model.auth import GoogleAuthRequest, GoogleUserInfo
-from google.oauth2 import id_token
+from google.auth import jwt as google_jwt
 from google.auth.transport import requests as google_requests
 
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+
+class GoogleCertSource:
+    """
+    Google's signing certs (key id -> PEM), fetched off the event loop and
+    kept until the max-age of their Cache-Control header runs out. Forced
+    refreshes, for tokens with an unknown key id, happen at most once per
+    min_refresh_interval seconds, so junk tokens cannot make us call Google
+    on every request.
+    """
+    def __init__(self, url: str = GOOGLE_CERTS_URL, default_max_age: int = 3600, min_refresh_interval: float = 60):
+        self.url = url
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self._certs = None
+        self._expires_at = 0.0
+        self._fetched_at = None
+        self._lock = asyncio.Lock()
+        # one pooled HTTP session for every refresh
+        self._request = google_requests.Request()
+
+    def _fetch(self) -> tuple[dict, int]:
+        response = self._request(self.url, method="GET")
+        if response.status != 200:
+            raise ValueError(f"Could not fetch Google certs, status {response.status}")
+        match = re.search(r"max-age=(\d+)", response.headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else self.default_max_age
+        return json.loads(response.data), max_age
+
+    def _fresh(self, refresh: bool) -> bool:
+        if self._certs is None:
+            return False
+        now = time.monotonic()
+        if refresh:
+            # a forced refresh within the interval gets the certs we already have
+            return now - self._fetched_at < self.min_refresh_interval
+        return now < self._expires_at
+
+    async def get_certs(self, refresh: bool = False) -> dict:
+        if self._fresh(refresh):
+            return self._certs
+        async with self._lock:
+            # another request may have refreshed them while we waited
+            if self._fresh(refresh):
+                return self._certs
+            certs, max_age = await asyncio.get_running_loop().run_in_executor(None, self._fetch)
+            self._certs = certs
+            self._fetched_at = time.monotonic()
+            self._expires_at = self._fetched_at + max_age
+            return certs
+
+
+class StaticCertSource:
+    """Fixed key set, for tests and local runs without network access"""
+    def __init__(self, certs: dict):
+        self.certs = certs
+
+    async def get_certs(self, refresh: bool = False) -> dict:
+        return self.certs
+
+
 class GoogleAuthProvider:
-    def __init__(self, client_id: str, client_secret: str):
+    def __init__(self, client_id: str, client_secret: str, cert_source=None):
         self.client_id = client_id
         self.client_secret = client_secret
+        self.cert_source = cert_source or GoogleCertSource()
+
+    def _decode(self, token: str, certs: dict) -> dict:
+        id_info = google_jwt.decode(token, certs=certs, audience=self.client_id, clock_skew_in_seconds=10)
+        if id_info.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {id_info.get('iss')}")
+        return id_info
 
     async def verify_token(self, token: str) -> GoogleUserInfo:
+        loop = asyncio.get_running_loop()
+        certs = await self.cert_source.get_certs()
         try:
-            id_info = id_token.verify_oauth2_token(token, google_requests.Request(), self.client_id)
-            return GoogleUserInfo(**id_info)
-        except Exception as e:
-            raise e
\ No newline at end of file
+            id_info = await loop.run_in_executor(None, partial(self._decode, token, certs))
+        except ValueError as e:
+            # Google rotated its keys before our cached set expired
+            if "Certificate for key id" not in str(e):
+                raise
+            refreshed = await self.cert_source.get_certs(refresh=True)
+            if refreshed is certs:
+                # refreshed too recently to fetch again: the key id is unknown
+                raise
+            id_info = await loop.run_in_executor(None, partial(self._decode, token, refreshed))
+
+        return GoogleUserInfo(
+            id=id_info["sub"],
+            email=id_info["email"],
+            name=id_info.get("name", id_info["email"]),
+            picture=id_info.get("picture", "")
+        )
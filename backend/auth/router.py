@@ -3,7 +3,8 @@ from fastapi.security import OAuth2PasswordRequestForm
 from typing import Annotated
 from backend.core.model.auth import GoogleAuthRequest, EmailAuthRequest
 from backend.core.model.user import User
-from backend.auth.service import AuthService
+from backend.auth.service import AuthService, auth_cache_stats
+from backend.auth.hashing import password_hasher
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 auth_service = AuthService()
@@ -64,4 +65,26 @@ async def get_access_token_route(form_data: Annotated[OAuth2PasswordRequestForm,
     return {
         "access_token": token_info["access_token"], 
         "token_type": token_info["token_type"]
-    }
\ No newline at end of file
+    }
+
+@router.get("/hashing/stats")
+async def get_hashing_stats() -> dict:
+    """
+    Password hashing metrics - queue depth, concurrency and latency of bcrypt calls
+    """
+    return {
+        "status": 1,
+        "data": password_hasher.stats(),
+        "message": "Successfully retrieved hashing stats"
+    }
+
+@router.get("/cache/stats")
+async def get_auth_cache_stats() -> dict:
+    """
+    Token and user cache metrics of the current user resolution
+    """
+    return {
+        "status": 1,
+        "data": auth_cache_stats(),
+        "message": "Successfully retrieved auth cache stats"
+    }
@@ -2,7 +2,10 @@ from typing import Annotated, Optional
 from fastapi import Depends, HTTPException, status
 from jose import JWTError, jwt
 from datetime import datetime as dt, timedelta as td, timezone as tz
+from backend.core.cache import TTLCache
 from backend.core.database import MongoAsyncClient
+from backend.core.metrics import span
+from backend.core.pubsub import pubsub
 from backend.core.model.user import User, user_collection
 from backend.core.model.auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES, 
@@ -10,14 +13,47 @@ from backend.core.model.auth import (
     ACCESS_TOKEN_SECRET_KEY,
     access_token_collection,
     AccessToken,
-    oauth2_scheme,
-    pwd_context
+    oauth2_scheme
 )
+from backend.auth.hashing import password_hasher
 from backend.auth.providers.google import GoogleAuthProvider
 import uuid
 import os
 
 _db = MongoAsyncClient()
+
+# token -> (user_id, exp) of its already verified claims
+_claims_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_CLAIMS_CACHE_TTL_SECONDS", "300"))
+)
+# user_id -> User, dropped through invalidate_user whenever the record changes
+_user_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "30"))
+)
+
+
+# pub/sub channel dropping a user record from the caches of every worker
+USER_INVALIDATION_CHANNEL = "auth.user_invalidated"
+
+
+async def invalidate_user(user_id: str):
+    """Forget the cached record of a user after it was updated or deactivated, on every worker"""
+    _user_cache.pop(user_id)
+    await pubsub.publish(USER_INVALIDATION_CHANNEL, {"user_id": user_id})
+
+
+async def _on_user_invalidated(message: dict):
+    _user_cache.pop(message["user_id"])
+
+
+pubsub.subscribe(USER_INVALIDATION_CHANNEL, _on_user_invalidated)
+
+
+def auth_cache_stats() -> dict:
+    return {"claims": _claims_cache.stats(), "users": _user_cache.stats()}
+
 class AuthService:
     def __init__(self):
         self.db = _db
@@ -28,12 +64,13 @@ class AuthService:
         self.secret_key = ACCESS_TOKEN_SECRET_KEY
         self.algorithm = ALGORITHM
         self.access_token_expire_minutes = ACCESS_TOKEN_EXPIRE_MINUTES
+        self.hasher = password_hasher
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.hasher.verify(plain_password, hashed_password)
 
-    def get_password_hash(self, password: str) -> str:
-        return pwd_context.hash(password)
+    async def get_password_hash(self, password: str) -> str:
+        return await self.hasher.hash(password)
 
     def create_access_token(self, user_id: str) :
         to_encode = {}
@@ -51,6 +88,7 @@ class AuthService:
             user_id=user_id,
             created_at=int(current_time.timestamp()),
             expires_at=int(expire.timestamp()),
+            expire_date=expire,
             is_active=True
         )
 
@@ -107,8 +145,20 @@ class AuthService:
             return None
         
         user = User(**user_dict)
-        if not self.verify_password(password, user.hashed_pwd):
+        is_valid, new_hash = await self.hasher.verify_and_update(password, user.hashed_pwd)
+        if not is_valid:
             return None
+
+        # the stored hash was made with another bcrypt cost, upgrade it while we have the password
+        if new_hash:
+            user.hashed_pwd = new_hash
+            user.updated_at = int(dt.now(tz.utc).timestamp())
+            await self.db.update_one(
+                user_collection,
+                {"id": user.id},
+                {"hashed_pwd": user.hashed_pwd, "updated_at": user.updated_at}
+            )
+            await invalidate_user(user.id)
         return user
 
     async def authenticate_google_user(self, token: str) -> Optional[User]:
@@ -132,6 +182,7 @@ class AuthService:
                     }
                 )
                 user.google_id = google_user_info.id
+                await invalidate_user(user.id)
             
             return user
         else:
@@ -139,7 +190,7 @@ class AuthService:
                 id=str(uuid.uuid4())[:8],
                 google_id=google_user_info.id,
                 email=google_user_info.email,
-                hashed_pwd=self.get_password_hash(google_user_info.id),
+                hashed_pwd=await self.get_password_hash(google_user_info.id),
                 name=google_user_info.name,
                 created_at=int(dt.now(tz.utc).timestamp()),
                 updated_at=int(dt.now(tz.utc).timestamp()),
@@ -148,33 +199,58 @@ class AuthService:
             await self.db.insert_one(user_collection, new_user.model_dump())
             return new_user
 
-# separated function for other routers authentication
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> User:
+async def resolve_user(token: str) -> User:
     """
-    Dependency function to get current authenticated user from JWT token
-    This can be used across all routers without instantiating AuthService
+    Decode a JWT and load its user, raising 401 when either step fails.
+    Shared by the bearer dependency and the websocket endpoints, which
+    receive the token as a query parameter.
+    Verified claims and user records are cached, so a repeat request
+    costs two dict lookups instead of a decode and a Mongo round-trip.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    try:
-        payload = jwt.decode(token, ACCESS_TOKEN_SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        
-        if user_id is None:
+
+    claims = _claims_cache.get(token)
+    if claims is None:
+        try:
+            payload = jwt.decode(token, ACCESS_TOKEN_SECRET_KEY, algorithms=[ALGORITHM])
+            user_id: str = payload.get("sub")
+
+            if user_id is None:
+                raise credentials_exception
+
+        except JWTError:
             raise credentials_exception
-            
-    except JWTError:
-        raise credentials_exception
-    
-    user_dict = await _db.find_one(user_collection, {"id": user_id})
-    if user_dict is None:
+        claims = (user_id, payload.get("exp"))
+        _claims_cache.set(token, claims)
+
+    user_id, expires_at = claims
+    # a cached token must still stop working at its exp
+    if expires_at is not None and expires_at <= dt.now(tz.utc).timestamp():
+        _claims_cache.pop(token)
         raise credentials_exception
-    
-    return User(**user_dict)
+
+    user = _user_cache.get(user_id)
+    if user is None:
+        user_dict = await _db.find_one(user_collection, {"id": user_id})
+        if user_dict is None:
+            raise credentials_exception
+        user = User(**user_dict)
+        _user_cache.set(user_id, user)
+
+    return user
+
+# separated function for other routers authentication
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> User:
+    """
+    Dependency function to get current authenticated user from JWT token
+    This can be used across all routers without instantiating AuthService
+    """
+    with span("auth"):
+        return await resolve_user(token)
 
 async def get_current_active_user(
     current_user: Annotated[User, Depends(get_current_user)]
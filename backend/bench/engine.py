@@ -0,0 +1,98 @@
+import random
+from backend.game.providers.board import GomokuBoard
+from backend.game.providers.gomoku import Gomoku
+from backend.game.providers.zobrist import zobrist_key
+from backend.bench.timing import measure
+
+# stones on the board for each density measured
+DENSITIES = {"early": 10, "mid": 100, "late": 250}
+
+
+def sample_board(plies: int, seed: int = 0) -> tuple[dict, list[tuple[int, int]]]:
+    """A reproducible board of `plies` stones in play order, plus the cells still empty"""
+    rng = random.Random(seed)
+    cells = [(x, y) for x in range(Gomoku.BOARD_SIZE) for y in range(Gomoku.BOARD_SIZE)]
+    rng.shuffle(cells)
+    played, empty = cells[:plies], cells[plies:]
+    board = {"black": [list(c) for c in played[0::2]], "white": [list(c) for c in played[1::2]]}
+    return board, empty
+
+
+class BaselineGomoku:
+    """The list-scanning engine the bitboard replaced, kept as the reference to compare against"""
+    DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1), (1, 1), (-1, -1), (1, -1), (-1, 1)]
+
+    def is_valid_move(self, board: dict, x: int, y: int) -> bool:
+        if x < 0 or x > Gomoku.BOARD_SIZE - 1 or y < 0 or y > Gomoku.BOARD_SIZE - 1:
+            return False
+        return [x, y] not in board["black"] and [x, y] not in board["white"]
+
+    def move(self, board: dict, color: str, x: int, y: int):
+        if not self.is_valid_move(board, x, y):
+            raise ValueError(f"Invalid move: {x}, {y}, {color}")
+        board[color].append([x, y])
+        return board, self.check_win_with_last_move(board, color, x, y)
+
+    def check_win_with_last_move(self, board: dict, color: str, last_x: int, last_y: int) -> bool:
+        pieces = board[color]
+        for dx, dy in self.DIRECTIONS:
+            count = 1
+            for i in range(1, 5):
+                if [last_x + dx * i, last_y + dy * i] in pieces:
+                    count += 1
+                else:
+                    break
+            if count >= 5:
+                return True
+        return False
+
+
+def _unplace(bitboard: GomokuBoard, color: str, x: int, y: int):
+    idx = bitboard.index(x, y)
+    bitboard.bits[color] &= ~(1 << idx)
+    bitboard.moves[color].pop()
+    bitboard.hash ^= zobrist_key(color, x, y)
+
+
+def run(number: int = 1000) -> dict:
+    """
+    Engine hot paths at each density: the baseline list-scanning engine,
+    the stored board dict as the current engine checks it, and a prepared
+    bitboard as the cache uses it
+    """
+    gomoku = Gomoku()
+    baseline = BaselineGomoku()
+    results = {}
+    for density, plies in DENSITIES.items():
+        board, empty = sample_board(plies)
+        bitboard = gomoku.load_board(board)
+        to_move = "black" if plies % 2 == 0 else "white"
+        last_color = "white" if to_move == "black" else "black"
+        last_x, last_y = board[last_color][-1]
+        x, y = empty[0]
+
+        def move_dict(engine):
+            def move():
+                engine.move(board, to_move, x, y)
+                board[to_move].pop()
+            return move
+
+        def move_bitboard():
+            gomoku.move(bitboard, to_move, x, y)
+            _unplace(bitboard, to_move, x, y)
+
+        cases = {
+            "is_valid_move.baseline": lambda: baseline.is_valid_move(board, x, y),
+            "is_valid_move.dict": lambda: gomoku.is_valid_move(board, x, y),
+            "is_valid_move.bitboard": lambda: gomoku.is_valid_move(bitboard, x, y),
+            "move.baseline": move_dict(baseline),
+            "move.dict": move_dict(gomoku),
+            "move.bitboard": move_bitboard,
+            "check_win_with_last_move.baseline": lambda: baseline.check_win_with_last_move(board, last_color, last_x, last_y),
+            "check_win_with_last_move.dict": lambda: gomoku.check_win_with_last_move(board, last_color, last_x, last_y),
+            "check_win_with_last_move.bitboard": lambda: gomoku.check_win_with_last_move(bitboard, last_color, last_x, last_y),
+            "check_win.bitboard": lambda: gomoku.check_win(bitboard),
+        }
+        for name, fn in cases.items():
+            results[f"engine.{name}.{density}"] = measure(fn, number, plies=plies)
+    return results
@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+import httpx
+from backend.bench.timing import summarize
+
+# one game of the script: black lines up five on row `row`, white answers on the next row
+WIN_PLIES = 9
+
+
+class LoadStats:
+    """Latency samples and error counts per endpoint template"""
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.games = 0
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def report(self, elapsed: float) -> dict:
+        requests = sum(len(samples) for samples in self.latencies.values())
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            summary = summarize(samples)
+            percentiles = sorted(samples)
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors[endpoint],
+                "error_rate": self.errors[endpoint] / len(samples),
+                "p50_ms": summary["median_us"] / 1000,
+                "p95_ms": summary["p95_us"] / 1000,
+                "p99_ms": percentiles[min(len(percentiles) - 1, int(0.99 * len(percentiles)))] * 1000,
+                "max_ms": percentiles[-1] * 1000,
+            }
+        return {
+            "seconds": elapsed,
+            "requests": requests,
+            "errors": sum(self.errors.values()),
+            "requests_per_second": requests / elapsed if elapsed else 0.0,
+            "games": self.games,
+            "games_per_second": self.games / elapsed if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+class Player:
+    def __init__(self, client: httpx.AsyncClient, stats: LoadStats, name: str):
+        self.client = client
+        self.stats = stats
+        self.email = f"{name}@example.com"
+        self.name = name
+        self.headers = {}
+
+    async def call(self, method: str, endpoint: str, url: str, **kwargs) -> dict | None:
+        """One request, timed under its endpoint template; None when it failed"""
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.stats.record(endpoint, time.perf_counter() - started, ok)
+        return response.json() if ok else None
+
+    async def sign_up(self) -> bool:
+        created = await self.call("POST", "/user/create", "/user/create",
+                                  json={"email": self.email, "name": self.name, "pwd": "load-test"})
+        if created is None:
+            return False
+        token = await self.call("POST", "/auth/email/login", "/auth/email/login",
+                                json={"email": self.email, "pwd": "load-test"})
+        if token is None:
+            return False
+        self.headers = {"Authorization": f"Bearer {token['access_token']}"}
+        return True
+
+
+async def play_game(black: Player, white: Player, row: int, poll: bool) -> bool:
+    """create, join, then alternate moves until black has five on `row`; False on the first failure"""
+    created = await black.call("POST", "/game/create", "/game/create", json={"type": "gomoku"})
+    if created is None:
+        return False
+    game = created["data"]
+    if await white.call("POST", "/game/join", "/game/join", json={"search_id": game["search_id"]}) is None:
+        return False
+
+    move_url = f"/game/gomoku/{game['id']}/move"
+    status_url = f"/game/gomoku/{game['id']}/status"
+    for ply in range(WIN_PLIES):
+        player, waiting = (black, white) if ply % 2 == 0 else (white, black)
+        x, y = (row, ply // 2) if ply % 2 == 0 else (row + 1, ply // 2)
+        moved = await player.call("POST", "/game/gomoku/{game_id}/move", move_url, json={"x": x, "y": y})
+        if moved is None:
+            return False
+        if poll and await waiting.call("GET", "/game/gomoku/{game_id}/status", status_url) is None:
+            return False
+    return moved["data"]["data"]["winner"] == "black"
+
+
+async def run_pair(client: httpx.AsyncClient, stats: LoadStats, run_id: str, pair: int, deadline: float, games: int, poll: bool):
+    black = Player(client, stats, f"load-{run_id}-{pair}-b")
+    white = Player(client, stats, f"load-{run_id}-{pair}-w")
+    if not (await black.sign_up() and await white.sign_up()):
+        return
+    played = 0
+    # closed loop: the next game starts as soon as the previous one ended
+    while time.monotonic() < deadline and (not games or played < games):
+        if await play_game(black, white, row=2 * (played % 9), poll=poll):
+            stats.games += 1
+        played += 1
+
+
+@asynccontextmanager
+async def in_process_client():
+    """An httpx client calling the app in-process, with every service on an in-memory Mongo"""
+    from backend.bench.service import use_in_memory_mongo, drop_partial_indexes
+    use_in_memory_mongo()
+    from backend.main import app
+
+    async with app.router.lifespan_context(app):
+        await drop_partial_indexes()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load.test") as client:
+            yield client
+
+
+async def run(pairs: int, duration: float, games: int = 0, url: str = None, poll: bool = True) -> dict:
+    """
+    Drive `pairs` concurrent player pairs through sign up, login and full
+    games, for `duration` seconds or `games` games per pair. Runs against
+    the app in-process unless url points at a running server.
+    """
+    stats = LoadStats()
+    run_id = uuid.uuid4().hex[:6]
+    if url:
+        limits = httpx.Limits(max_connections=pairs * 2, max_keepalive_connections=pairs * 2)
+        context = httpx.AsyncClient(base_url=url, limits=limits, timeout=30)
+    else:
+        context = in_process_client()
+
+    async with context as client:
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(run_pair(client, stats, run_id, pair, deadline, games, poll) for pair in range(pairs)))
+        elapsed = time.monotonic() - started
+    return stats.report(elapsed)
+
+
+def print_report(report: dict):
+    print(f"{report['requests']} requests, {report['errors']} errors in {report['seconds']:.1f}s: "
+          f"{report['requests_per_second']:.1f} req/s, {report['games_per_second']:.2f} games/s")
+    width = max((len(endpoint) for endpoint in report["endpoints"]), default=10)
+    print(f"{'endpoint':<{width}} {'requests':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, row in report["endpoints"].items():
+        print(f"{endpoint:<{width}} {row['requests']:>8} {row['error_rate']:>7.1%} "
+              f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Closed-loop load test playing full gomoku games")
+    parser.add_argument("--pairs", type=int, default=10, help="concurrent player pairs")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to keep starting games")
+    parser.add_argument("--games", type=int, default=0, help="stop each pair after this many games, 0 = no limit")
+    parser.add_argument("--url", help="base url of a running server, default runs the app in-process on an in-memory Mongo")
+    parser.add_argument("--no-poll", action="store_true", help="skip the status poll after every move")
+    parser.add_argument("--output", help="also save the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.pairs, args.duration, args.games, args.url, poll=not args.no_poll))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    # python -m backend.bench.loadtest --pairs 20 --duration 60 [--url http://localhost:8000]
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import json
+import platform
+import sys
+from datetime import datetime as dt, timezone as tz
+from backend.bench.timing import print_results
+
+SUITES = ("engine", "service", "serialization")
+
+
+def run_suites(suites: list[str], number: int) -> dict:
+    results = {}
+    if "engine" in suites:
+        from backend.bench import engine
+        results.update(engine.run(number))
+    if "service" in suites:
+        from backend.bench import service
+        results.update(asyncio.run(service.run(max(number // 5, 50))))
+    if "serialization" in suites:
+        from backend.bench import serialization
+        results.update(serialization.run(number))
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Benchmarks whose median got slower than the baseline by more than threshold"""
+    return [
+        name for name, result in results.items()
+        if name in baseline and result["median_us"] > baseline[name]["median_us"] * (1 + threshold)
+    ]
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Gomoku engine and game service benchmarks")
+    parser.add_argument("--suite", default=",".join(SUITES), help=f"comma separated subset of {', '.join(SUITES)}")
+    parser.add_argument("--number", type=int, default=1000, help="calls per sample of the micro-benchmarks")
+    parser.add_argument("--output", default="bench-results.json", help="where to save the results as JSON")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown of a median, 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    suites = [suite.strip() for suite in args.suite.split(",") if suite.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+
+    results = run_suites(suites, args.number)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "created_at": dt.now(tz.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "number": args.number,
+            "results": results
+        }, f, indent=2)
+    print(f"Saved {len(results)} results to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"No regression over {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    # python -m backend.bench.run [--suite engine,service] [--baseline bench-results.json]
+    sys.exit(main())
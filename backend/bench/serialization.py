@@ -0,0 +1,62 @@
+import random
+import sys
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from backend.core.model.game import Game, GameType
+from backend.core.response import envelope
+from backend.bench.timing import measure, print_results
+from backend.game.providers.gomoku import Gomoku
+
+# plies of the boards measured: an early game and one close to a full board
+BOARDS = {"typical": 40, "late": 300}
+
+
+def sample_game(plies: int, seed: int = 0) -> Game:
+    rng = random.Random(seed)
+    cells = rng.sample([(x, y) for x in range(Gomoku.BOARD_SIZE) for y in range(Gomoku.BOARD_SIZE)], plies)
+    board = {"black": [list(c) for c in cells[0::2]], "white": [list(c) for c in cells[1::2]]}
+    return Game(
+        id="18f0c2a1b3d", search_id="123456", user_id="p1", type=GameType.GOMOKU,
+        created_at=1700000000, updated_at=1700000000,
+        data={"p1_id": "p1", "p2_id": "p2", "p1_color": "black", "p2_color": "white", "board": board, "winner": None}
+    )
+
+
+_dict_adapter = TypeAdapter(dict)
+
+
+def stdlib_path(game: Game) -> bytes:
+    """What a `-> dict` handler costs: return value validation, jsonable_encoder, json.dumps"""
+    content = {"status": 1, "data": game.model_dump(), "message": "Gomoku board retrieved"}
+    return JSONResponse(jsonable_encoder(_dict_adapter.validate_python(content))).body
+
+
+def envelope_path(game: Game) -> bytes:
+    return envelope(game, "Gomoku board retrieved").body
+
+
+def compact_path(game: Game, gomoku: Gomoku = Gomoku()) -> bytes:
+    data = game.model_dump()
+    data["data"]["moves"] = gomoku.compact_board(data["data"].pop("board"))
+    return envelope(data, "Gomoku board retrieved").body
+
+
+PATHS = {"stdlib": stdlib_path, "envelope": envelope_path, "compact": compact_path}
+
+
+def run(number: int = 2000) -> dict:
+    """Cost of one serialized status response and its body size, per board and path"""
+    results = {}
+    for name, plies in BOARDS.items():
+        game = sample_game(plies)
+        for path, serialize in PATHS.items():
+            results[f"serialization.{path}.{name}"] = measure(
+                lambda: serialize(game), number, plies=plies, bytes=len(serialize(game))
+            )
+    return results
+
+
+if __name__ == "__main__":
+    # python -m backend.bench.serialization [iterations]
+    print_results(run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
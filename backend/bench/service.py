@@ -0,0 +1,112 @@
+import os
+
+# the service modules read these at import time
+os.environ.setdefault("MONGO_URL", "mongodb://bench")
+os.environ.setdefault("MONGO_DB_NAME", "gomoku_bench")
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret")
+
+import random
+from mongomock_motor import AsyncMongoMockClient
+from backend.core import database
+from backend.bench.timing import measure_async
+
+
+def use_in_memory_mongo():
+    """Point every MongoAsyncClient of the process at an in-memory mongomock database"""
+    database._clients[os.environ["MONGO_URL"]] = AsyncMongoMockClient()
+
+
+async def drop_partial_indexes():
+    """
+    mongomock ignores partialFilterExpression and would enforce partial
+    unique indexes on every document, e.g. reject two finished games that
+    held the same recycled search id. Drop them after ensure_indexes.
+    """
+    from backend.core.indexes import INDEX_SPECS
+
+    db = database.MongoAsyncClient()
+    for collection, (indexes, _) in INDEX_SPECS.items():
+        for index in indexes:
+            if "partialFilterExpression" in index.document:
+                await db.drop_index(collection, index.document["name"])
+
+
+async def _bench_gomoku_move(service, number: int, seed: int = 0) -> dict:
+    from backend.core.model.game import CreateGameRequest, GameType, GomokuMoveRequest
+
+    rng = random.Random(seed)
+    players = ("bench-p1", "bench-p2")
+    state = {}
+
+    async def new_game():
+        game = await service.create_game(players[0], CreateGameRequest(type=GameType.GOMOKU), opponent_id=players[1])
+        cells = [(x, y) for x in range(service.gomoku.BOARD_SIZE) for y in range(service.gomoku.BOARD_SIZE)]
+        rng.shuffle(cells)
+        state.update(game_id=game.id, cells=cells, ply=0)
+
+    async def setup():
+        if not state or state["ply"] >= 60:
+            await new_game()
+        else:
+            game = await service.get_game(state["game_id"])
+            if game.data["winner"]:
+                await new_game()
+
+    async def move():
+        x, y = state["cells"][state["ply"]]
+        await service.gomoku_move(players[state["ply"] % 2], state["game_id"], GomokuMoveRequest(x=x, y=y))
+        state["ply"] += 1
+
+    return await measure_async(move, number, setup=setup)
+
+
+async def _bench_cache_flush(service, number: int) -> dict:
+    """One write-behind flush of the moves a single game made since the last flush"""
+    from backend.core.model.game import CreateGameRequest, GameType
+
+    async def setup():
+        game = await service.create_game("bench-p1", CreateGameRequest(type=GameType.GOMOKU), opponent_id="bench-p2")
+        entry = await service.get_cached_game(game.id)
+        for i, (x, y) in enumerate([(0, 0), (5, 5), (0, 2), (5, 7)]):
+            await service.apply_gomoku_move(entry, "black" if i % 2 == 0 else "white", x, y)
+
+    return await measure_async(service.cache.flush, number, setup=setup)
+
+
+async def _bench_current_user(number: int) -> dict:
+    from backend.auth import service as auth
+    from backend.core.model.user import CreateUserRequest
+    from backend.user.service import UserService
+
+    user = await UserService().create_user(CreateUserRequest(email="bench@example.com", name="bench", pwd="bench"))
+    token = auth.AuthService().create_access_token(user.id).token
+
+    async def clear():
+        auth._claims_cache.clear()
+        auth._user_cache.clear()
+
+    return {
+        "cold": await measure_async(lambda: auth.get_current_user(token), number, setup=clear),
+        "warm": await measure_async(lambda: auth.get_current_user(token), number),
+    }
+
+
+async def run(number: int = 200) -> dict:
+    """Service hot paths against an in-memory Mongo, so results measure our code rather than the network"""
+    use_in_memory_mongo()
+    from backend.core.indexes import ensure_indexes
+    from backend.game.service import GameService
+
+    await ensure_indexes()
+    await drop_partial_indexes()
+    service = GameService()
+    try:
+        current_user = await _bench_current_user(number)
+        return {
+            "service.gomoku_move": await _bench_gomoku_move(service, number),
+            "service.cache_flush": await _bench_cache_flush(service, number),
+            "service.get_current_user.cold": current_user["cold"],
+            "service.get_current_user.warm": current_user["warm"],
+        }
+    finally:
+        await service.stop()
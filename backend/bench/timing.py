@@ -0,0 +1,53 @@
+import gc
+import statistics
+import time
+import timeit
+
+
+def summarize(samples: list[float], **extra) -> dict:
+    """Per-operation statistics of samples given in seconds, reported in microseconds"""
+    samples = sorted(samples)
+    return {
+        "median_us": statistics.median(samples) * 1e6,
+        "min_us": samples[0] * 1e6,
+        "p95_us": samples[min(len(samples) - 1, int(0.95 * len(samples)))] * 1e6,
+        "samples": len(samples),
+        **extra
+    }
+
+
+def measure(fn, number: int = 1000, repeat: int = 7, **extra) -> dict:
+    """Time a synchronous callable: each sample is the mean of `number` calls"""
+    fn()  # warm caches and lazily built tables first
+    totals = timeit.repeat(fn, number=number, repeat=repeat)
+    return summarize([total / number for total in totals], **extra)
+
+
+async def measure_async(fn, number: int = 200, setup=None, **extra) -> dict:
+    """Time `number` awaits of fn(), one sample each; setup() runs untimed before every call"""
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(number):
+            if setup is not None:
+                await setup()
+            started = time.perf_counter()
+            await fn()
+            samples.append(time.perf_counter() - started)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return summarize(samples, **extra)
+
+
+def print_results(results: dict, baseline: dict = None):
+    """One line per benchmark, with the change against the baseline median when given"""
+    width = max((len(name) for name in results), default=10)
+    print(f"{'benchmark':<{width}} {'median us':>10} {'p95 us':>10}" + (f" {'change':>8}" if baseline else ""))
+    for name, result in results.items():
+        line = f"{name:<{width}} {result['median_us']:>10.2f} {result['p95_us']:>10.2f}"
+        if baseline:
+            before = baseline.get(name)
+            line += f" {result['median_us'] / before['median_us'] - 1:>+8.1%}" if before else f" {'new':>8}"
+        print(line)
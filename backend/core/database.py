@@ -1,71 +1,229 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 from dotenv import load_dotenv
+import bson
+import functools
 import os
+import time
+from backend.core.metrics import metrics
 
 load_dotenv("backend/.env")
 
+# process-wide motor clients keyed by connection url, shared by every service
+_clients: dict[str, AsyncIOMotorClient] = {}
+
+
+def mongo_client_options() -> dict:
+    """Pool, timeout, read preference and write concern settings, tunable through env"""
+    options = {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000")),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000")),
+        "readPreference": os.getenv("MONGO_READ_PREFERENCE", "primary"),
+    }
+    # the server's default write concern unless one is configured
+    write_concern = os.getenv("MONGO_WRITE_CONCERN")
+    if write_concern:
+        options["w"] = int(write_concern) if write_concern.isdigit() else write_concern
+    return options
+
+
+def get_mongo_client(db_url: str = None) -> AsyncIOMotorClient:
+    """Return the shared client for db_url, creating it on first use"""
+    db_url = db_url or os.getenv("MONGO_URL")
+    client = _clients.get(db_url)
+    if client is None:
+        client = AsyncIOMotorClient(db_url, **mongo_client_options())
+        _clients[db_url] = client
+    return client
+
+
+def open_mongo_clients():
+    """Create the default client up front, called from the app lifespan"""
+    get_mongo_client()
+
+
+async def close_mongo_clients():
+    """Close every shared client, called from the app lifespan"""
+    for client in _clients.values():
+        client.close()
+    _clients.clear()
+
+
+def _size(documents) -> int:
+    if not metrics.db_bytes:
+        return 0
+    return sum(len(bson.encode(document)) for document in documents if document)
+
+
+# (args, result) -> (documents, bytes) of each timed operation; args start after the collection
+_COUNTERS = {
+    "insert_one": lambda args, result: (1, _size(args[:1])),
+    "insert_many": lambda args, result: (len(args[0]), _size(args[0])),
+    "find_one": lambda args, result: (int(result is not None), _size([result])),
+    "find_many": lambda args, result: (len(result), _size(result)),
+    "find_one_and_update": lambda args, result: (int(result is not None), _size([result])),
+}
+
+
+def _timed(method):
+    """Record latency, documents and bytes of a MongoAsyncClient operation per collection and op"""
+    op = method.__name__
+    count = _COUNTERS.get(op, lambda args, result: (result or 0, _size(args[1:2])))
+
+    @functools.wraps(method)
+    async def wrapper(self, collection: str, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = await method(self, collection, *args, **kwargs)
+        except Exception:
+            metrics.observe_db(collection, op, time.perf_counter() - started, error=True)
+            raise
+        documents, size = count(args, result)
+        metrics.observe_db(collection, op, time.perf_counter() - started, documents, size)
+        return result
+    return wrapper
+
+
 class MongoAsyncClient:
+    """Thin per-service handle over the shared client of the process"""
     def __init__(self):
         self.db_url = os.getenv("MONGO_URL")
         self.db_name = os.getenv("MONGO_DB_NAME")
-        self.client = AsyncIOMotorClient(self.db_url)
-        self.db = self.client[self.db_name]
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        return get_mongo_client(self.db_url)
+
+    @property
+    def db(self):
+        return self.client[self.db_name]
 
     def list_collections(self):
         """List all collections in the database"""
         return self.db.list_collection_names()
 
+    @_timed
     async def insert_one(self, collection: str, document: dict):
         """Create a single document"""
         collection = self.db[collection]
         result = await collection.insert_one(document)
         return result.inserted_id
 
-    async def insert_many(self, collection: str, documents: list[dict]):
-        """Create multiple documents"""
+    @_timed
+    async def insert_many(self, collection: str, documents: list[dict], ordered: bool = True):
+        """Create multiple documents; unordered inserts go on past failed documents"""
         collection = self.db[collection]
-        result = await collection.insert_many(documents)
+        result = await collection.insert_many(documents, ordered=ordered)
         return result.inserted_ids
 
+    @_timed
     async def find_one(self, collection: str, filter: dict):
         """Find a single document"""
         collection = self.db[collection]
         return await collection.find_one(filter)
 
-    async def find_many(self, collection: str, filter: dict = None):
-        """Find multiple documents"""
+    @_timed
+    async def find_many(self, collection: str, filter: dict = None, projection: dict = None, sort: list = None, limit: int = 0):
+        """Find multiple documents, optionally projected, sorted and capped at limit"""
         collection = self.db[collection]
         if filter is None:
             filter = {}
-        cursor = collection.find(filter)
-        return await cursor.to_list(length=None)
+        cursor = collection.find(filter, projection, sort=sort, limit=limit)
+        return await cursor.to_list(length=limit or None)
 
+    @_timed
+    async def count(self, collection: str, filter: dict = None) -> int:
+        """Number of matching documents"""
+        collection = self.db[collection]
+        return await collection.count_documents(filter or {})
+
+    async def iter_batches(self, collection: str, filter: dict = None, projection: dict = None, batch_size: int = 1000, sort: list = None):
+        """Stream matching documents as lists of at most batch_size documents"""
+        collection = self.db[collection]
+        if filter is None:
+            filter = {}
+        cursor = collection.find(filter, projection, batch_size=batch_size, sort=sort)
+        batch = []
+        started = time.perf_counter()
+        async for document in cursor:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                metrics.observe_db(collection.name, "iter_batches", time.perf_counter() - started, len(batch), _size(batch))
+                yield batch
+                batch = []
+                started = time.perf_counter()
+        if batch:
+            metrics.observe_db(collection.name, "iter_batches", time.perf_counter() - started, len(batch), _size(batch))
+            yield batch
+
+    @_timed
     async def update_one(self, collection: str, filter: dict, update: dict):
         """Update a single document"""
         collection = self.db[collection]
         result = await collection.update_one(filter, {"$set": update})
         return result.modified_count
 
+    @_timed
+    async def modify_one(self, collection: str, filter: dict, update: dict, upsert: bool = False):
+        """Apply raw update operators ($push, $inc, ...) to a single document"""
+        collection = self.db[collection]
+        result = await collection.update_one(filter, update, upsert=upsert)
+        return result.modified_count
+
+    @_timed
+    async def find_one_and_update(self, collection: str, filter: dict, update: dict, upsert: bool = False, sort: list = None):
+        """Apply raw update operators to a single document and return it as updated"""
+        collection = self.db[collection]
+        return await collection.find_one_and_update(
+            filter, update, upsert=upsert, sort=sort, return_document=ReturnDocument.AFTER
+        )
+
+    @_timed
     async def update_many(self, collection: str, filter: dict, update: dict):
         """Update multiple documents"""
         collection = self.db[collection]
         result = await collection.update_many(filter, {"$set": update})
         return result.modified_count
 
+    @_timed
     async def delete_one(self, collection: str, filter: dict):
         """Delete a single document"""
         collection = self.db[collection]
         result = await collection.delete_one(filter)
         return result.deleted_count
 
+    @_timed
     async def delete_many(self, collection: str, filter: dict):
         """Delete multiple documents"""
         collection = self.db[collection]
         result = await collection.delete_many(filter)
         return result.deleted_count
 
+    def watch(self, collection: str, pipeline: list = None, **kwargs):
+        """Change stream over a collection, used as `async with db.watch(...) as stream`"""
+        collection = self.db[collection]
+        return collection.watch(pipeline, **kwargs)
+
+    async def create_indexes(self, collection: str, indexes: list):
+        """Create the given pymongo IndexModels, existing ones are left untouched"""
+        collection = self.db[collection]
+        return await collection.create_indexes(indexes)
+
+    async def drop_index(self, collection: str, name: str):
+        collection = self.db[collection]
+        await collection.drop_index(name)
+
+    async def index_information(self, collection: str) -> dict:
+        """Index name -> index info as reported by the server"""
+        collection = self.db[collection]
+        return await collection.index_information()
+
     async def close(self):
-        """Close the database connection"""
-        self.client.close()
-        
-        
\ No newline at end of file
+        """
+        No-op: the client is shared with every other service of the process
+        and is closed once by close_mongo_clients at app shutdown
+        """
@@ -0,0 +1,59 @@
+from backend.core.database import MongoAsyncClient
+from backend.core.model.game import (
+    game_collection, game_indexes, game_query_shapes,
+    game_move_collection, game_move_indexes, game_move_query_shapes,
+    game_snapshot_collection, game_snapshot_indexes, game_snapshot_query_shapes,
+    match_ticket_collection, match_ticket_indexes, match_ticket_query_shapes
+)
+from backend.core.model.user import user_collection, user_indexes, user_query_shapes
+from backend.core.model.auth import access_token_collection, access_token_indexes, access_token_query_shapes
+from backend.core.model.pubsub import pubsub_collection, pubsub_indexes, pubsub_query_shapes
+
+# collection -> (indexes to create, query shapes that must be covered)
+INDEX_SPECS = {
+    game_collection: (game_indexes, game_query_shapes),
+    game_move_collection: (game_move_indexes, game_move_query_shapes),
+    game_snapshot_collection: (game_snapshot_indexes, game_snapshot_query_shapes),
+    match_ticket_collection: (match_ticket_indexes, match_ticket_query_shapes),
+    user_collection: (user_indexes, user_query_shapes),
+    access_token_collection: (access_token_indexes, access_token_query_shapes),
+    pubsub_collection: (pubsub_indexes, pubsub_query_shapes),
+}
+
+# indexes an earlier version created that now conflict with the declared ones
+RETIRED_INDEXES = {
+    # search ids are recycled, only active games must hold distinct ones
+    game_collection: ["search_id_unique"],
+}
+
+
+def is_supported(shape: tuple, index_keys: list) -> bool:
+    """A query shape is supported when its fields are exactly a prefix of the index keys"""
+    prefix = {field for field, _ in index_keys[:len(shape)]}
+    return len(index_keys) >= len(shape) and prefix == set(shape)
+
+
+async def ensure_indexes(db: MongoAsyncClient = None):
+    """Create every declared index, then check each query shape against the server"""
+    db = db or MongoAsyncClient()
+    for collection, names in RETIRED_INDEXES.items():
+        existing = await db.index_information(collection)
+        for name in names:
+            if name in existing:
+                await db.drop_index(collection, name)
+    for collection, (indexes, _) in INDEX_SPECS.items():
+        await db.create_indexes(collection, indexes)
+    await verify_query_shapes(db)
+
+
+async def verify_query_shapes(db: MongoAsyncClient = None):
+    db = db or MongoAsyncClient()
+    missing = []
+    for collection, (_, shapes) in INDEX_SPECS.items():
+        info = await db.index_information(collection)
+        index_keys = [list(index["key"]) for index in info.values()]
+        for shape in shapes:
+            if not any(is_supported(shape, keys) for keys in index_keys):
+                missing.append(f"{collection}: {', '.join(shape)}")
+    if missing:
+        raise RuntimeError(f"Queries without a supporting index: {'; '.join(missing)}")
@@ -0,0 +1,184 @@
+import bisect
+import contextvars
+import logging
+import os
+import random
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# upper bounds in seconds, shared by request and database histograms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout"""
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        total, result = 0, []
+        for bound, count in zip((*map(str, self.buckets), "+Inf"), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+# spans of the request being traced, None when it was not sampled
+_trace: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+
+
+class Metrics:
+    """
+    Process-wide request and database metrics, rendered in the Prometheus
+    text format. Requests slower than slow_request_ms are counted, and the
+    sampled ones keep a trace of their auth, Mongo and serialization spans.
+    """
+    def __init__(self, slow_request_ms: float, trace_sample_rate: float, db_bytes: bool, max_traces: int = 100):
+        self.slow_request_seconds = slow_request_ms / 1000
+        self.trace_sample_rate = trace_sample_rate
+        self.db_bytes = db_bytes
+        self.requests: dict[tuple, Histogram] = defaultdict(Histogram)
+        self.db_ops: dict[tuple, Histogram] = defaultdict(Histogram)
+        self.db_documents: dict[tuple, int] = defaultdict(int)
+        self.db_bytes_total: dict[tuple, int] = defaultdict(int)
+        self.db_errors: dict[tuple, int] = defaultdict(int)
+        self.slow_requests = 0
+        self.slow_traces = deque(maxlen=max_traces)
+
+    def start_trace(self) -> contextvars.Token | None:
+        if self.trace_sample_rate and random.random() < self.trace_sample_rate:
+            return _trace.set([])
+        return None
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, trace_token=None):
+        self.requests[(method, route, str(status))].observe(seconds)
+        spans = None
+        if trace_token is not None:
+            spans = _trace.get()
+            _trace.reset(trace_token)
+        if seconds < self.slow_request_seconds:
+            return
+        self.slow_requests += 1
+        if spans is not None:
+            trace = {
+                "method": method,
+                "route": route,
+                "status": status,
+                "ms": seconds * 1000,
+                "spans": spans
+            }
+            self.slow_traces.append(trace)
+            logger.warning("Slow request %s %s took %.1f ms: %s", method, route, seconds * 1000, spans)
+
+    def observe_db(self, collection: str, op: str, seconds: float, documents: int = 0, size: int = 0, error: bool = False):
+        key = (collection, op)
+        self.db_ops[key].observe(seconds)
+        self.db_documents[key] += documents
+        self.db_bytes_total[key] += size
+        if error:
+            self.db_errors[key] += 1
+        add_span(f"mongo.{op} {collection}", seconds)
+
+    def render(self) -> str:
+        lines = []
+
+        def histogram(name: str, help: str, series: dict, labels: tuple):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, hist in sorted(series.items()):
+                label = ",".join(f'{l}="{v}"' for l, v in zip(labels, key))
+                for bound, count in hist.cumulative():
+                    lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f"{name}_sum{{{label}}} {hist.sum}")
+                lines.append(f"{name}_count{{{label}}} {hist.count}")
+
+        def counter(name: str, help: str, series: dict, labels: tuple):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(series.items()):
+                label = ",".join(f'{l}="{v}"' for l, v in zip(labels, key))
+                lines.append(f"{name}{{{label}}} {value}")
+
+        histogram("http_request_duration_seconds", "Request latency per route", self.requests, ("method", "route", "status"))
+        histogram("mongo_operation_duration_seconds", "Mongo operation latency", self.db_ops, ("collection", "op"))
+        counter("mongo_documents_total", "Documents read, written or matched", self.db_documents, ("collection", "op"))
+        counter("mongo_bytes_total", "BSON bytes sent and received, with METRICS_DB_BYTES=1", self.db_bytes_total, ("collection", "op"))
+        counter("mongo_errors_total", "Failed Mongo operations", self.db_errors, ("collection", "op"))
+        lines.append("# HELP http_slow_requests_total Requests slower than the slow request threshold")
+        lines.append("# TYPE http_slow_requests_total counter")
+        lines.append(f"http_slow_requests_total {self.slow_requests}")
+        return "\n".join(lines) + "\n"
+
+
+def add_span(name: str, seconds: float):
+    """Add a span to the trace of the current request, if it is being traced"""
+    spans = _trace.get()
+    if spans is not None:
+        spans.append({"name": name, "ms": seconds * 1000})
+
+
+@contextmanager
+def span(name: str):
+    """Time a block as one span of the current request trace"""
+    if _trace.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_span(name, time.perf_counter() - started)
+
+
+metrics = Metrics(
+    slow_request_ms=float(os.getenv("METRICS_SLOW_REQUEST_MS", "250")),
+    trace_sample_rate=float(os.getenv("METRICS_TRACE_SAMPLE_RATE", "0")),
+    # measuring BSON sizes encodes every document a second time, so it is opt-in
+    db_bytes=os.getenv("METRICS_DB_BYTES", "0") == "1"
+)
+
+
+class TimingMiddleware:
+    """ASGI middleware recording the latency of every HTTP request under its route template"""
+    def __init__(self, app, registry: Metrics = metrics):
+        self.app = app
+        self.metrics = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        trace_token = self.metrics.start_trace()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # unmatched paths share one label, so scanners cannot blow up the series count
+            self.metrics.observe_request(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                status,
+                time.perf_counter() - started,
+                trace_token
+            )
@@ -2,7 +2,8 @@ from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
 from typing import Optional
-from passlib.context import CryptContext
+from datetime import datetime
+from pymongo import ASCENDING, IndexModel
 from fastapi.security import OAuth2PasswordBearer
 
 load_dotenv("backend/.env")
@@ -13,8 +14,19 @@ ACCESS_TOKEN_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 
 access_token_collection = "tokens"
 
+access_token_indexes = [
+    IndexModel(
+        [("user_id", ASCENDING), ("is_active", ASCENDING), ("expires_at", ASCENDING)],
+        name="user_id_is_active_expires_at"
+    ),
+    # mongo drops the token once expire_date has passed
+    IndexModel([("expire_date", ASCENDING)], name="expire_date_ttl", expireAfterSeconds=0),
+]
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# field sets of the queries the services run against the collection
+access_token_query_shapes = [
+    ("user_id", "expires_at", "is_active"),
+]
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/access_token")
 
@@ -37,4 +49,5 @@ class AccessToken(BaseModel):
     user_id: str
     created_at: int
     expires_at: int
-    is_active: bool = True
\ No newline at end of file
+    expire_date: Optional[datetime] = None  # same instant as expires_at, read by the TTL index
+    is_active: bool = True
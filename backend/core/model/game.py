@@ -1,18 +1,95 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from enum import Enum
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
 game_collection = "games"
 
+# p2_id of games played against the built-in gomoku AI
+GOMOKU_BOT_ID = "bot"
+
+game_indexes = [
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    # search ids are recycled once a game ends, so only active games must hold distinct ones
+    IndexModel(
+        [("search_id", ASCENDING), ("is_active", ASCENDING)],
+        name="search_id_active_unique",
+        unique=True,
+        partialFilterExpression={"is_active": True}
+    ),
+    IndexModel([("type", ASCENDING)], name="type"),
+    IndexModel([("can_join", ASCENDING), ("type", ASCENDING), ("id", DESCENDING)], name="can_join_type_id"),
+    # listings of every type: equality on can_join, then the id sort, all off the index
+    IndexModel([("can_join", ASCENDING), ("id", DESCENDING)], name="can_join_id"),
+    # the reaper's scan for unjoined lobbies and idle games, oldest first
+    IndexModel([("is_active", ASCENDING), ("can_join", ASCENDING), ("updated_at", ASCENDING)], name="is_active_can_join_updated_at"),
+]
+
+# field sets of the queries the services run against the collection
+game_query_shapes = [
+    ("id",),
+    ("search_id", "is_active"),
+    ("type",),
+    ("can_join",),
+    ("can_join", "type"),
+    ("can_join", "id"),
+    ("is_active", "can_join", "updated_at"),
+]
+
+# list views leave out the board, which is the bulk of a game document
+GAME_LIST_PROJECTION = {"_id": 0, "data.board": 0, "data.moves": 0}
+
+# append-only move events, one per ply, plus periodic board snapshots
+game_move_collection = "game_moves"
+game_snapshot_collection = "game_snapshots"
+
+# a snapshot is written every SNAPSHOT_INTERVAL plies, so a replay reads at most that many events
+SNAPSHOT_INTERVAL = 20
+
+game_move_indexes = [
+    IndexModel([("game_id", ASCENDING), ("ply", ASCENDING)], name="game_id_ply_unique", unique=True),
+]
+game_move_query_shapes = [
+    ("game_id", "ply"),
+]
+
+game_snapshot_indexes = [
+    IndexModel([("game_id", ASCENDING), ("ply", DESCENDING)], name="game_id_ply_unique", unique=True),
+]
+game_snapshot_query_shapes = [
+    ("game_id", "ply"),
+]
+
+# matchmaking tickets shared between workers
+match_ticket_collection = "match_tickets"
+
+match_ticket_indexes = [
+    IndexModel(
+        [("status", ASCENDING), ("type", ASCENDING), ("band", ASCENDING), ("created_at", ASCENDING)],
+        name="status_type_band_created_at"
+    ),
+    IndexModel([("worker", ASCENDING), ("status", ASCENDING)], name="worker_status"),
+    IndexModel([("expire_date", ASCENDING)], name="expire_date_ttl", expireAfterSeconds=0),
+]
+
+match_ticket_query_shapes = [
+    ("status", "type", "band"),
+    ("worker", "status"),
+]
+
 class GameType(Enum):
     GOMOKU = "gomoku"
 
 
 class CreateGameRequest(BaseModel):
     type: GameType
+    vs_bot: bool = False  # play against the server AI instead of waiting for a second player
 
 class JoinGameRequest(BaseModel):
     search_id: str
 
+class MatchRequest(BaseModel):
+    type: GameType
+
 
 class Game(BaseModel):
 
@@ -30,6 +107,5 @@ class Game(BaseModel):
 
 # Gomoku related models
 class GomokuMoveRequest(BaseModel):
-    x: int
     x: int = Field(..., ge=0, le=18)
     y: int = Field(..., ge=0, le=18)
@@ -0,0 +1,11 @@
+from pymongo import ASCENDING, IndexModel
+
+pubsub_collection = "pubsub_events"
+
+pubsub_indexes = [
+    # events are only read live through the change stream, mongo drops them soon after
+    IndexModel([("expire_date", ASCENDING)], name="expire_date_ttl", expireAfterSeconds=0),
+]
+
+# nothing queries the collection, subscribers watch its inserts
+pubsub_query_shapes = []
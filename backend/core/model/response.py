@@ -0,0 +1,24 @@
+from typing import Generic, Optional, TypeVar
+from pydantic import BaseModel
+from backend.core.model.user import LeaderboardEntry
+
+T = TypeVar("T")
+
+
+class Envelope(BaseModel, Generic[T]):
+    """Body of every successful API response"""
+    status: int = 1
+    data: T
+    message: str
+
+
+class GamePage(BaseModel):
+    games: list[dict]  # games without their boards
+    next_cursor: Optional[str] = None
+
+
+class LeaderboardPage(BaseModel):
+    players: list[LeaderboardEntry]
+    # keyset cursor of the next page, passed back as after_rating and after_id
+    next_after_rating: Optional[float] = None
+    next_after_id: Optional[str] = None
@@ -1,8 +1,32 @@
 from typing import Optional
 from pydantic import BaseModel, EmailStr
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
 user_collection = "users"
 
+user_indexes = [
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    IndexModel([("name", ASCENDING)], name="name"),
+    IndexModel([("google_id", ASCENDING)], name="google_id"),
+    # the leaderboard: pages and ranks are index range scans, never a sort over all users
+    IndexModel([("rating", DESCENDING), ("id", ASCENDING)], name="rating_id"),
+]
+
+# field sets of the queries the services run against the collection
+user_query_shapes = [
+    ("id",),
+    ("email",),
+    ("name",),
+    ("google_id",),
+    ("rating",),
+]
+
+# rated players are those who finished a rated game; accounts older than ratings have no rating stored
+RATED_FILTER = {"rating": {"$exists": True}}
+
+LEADERBOARD_PROJECTION = {"_id": 0, "id": 1, "name": 1, "rating": 1, "games_played": 1, "wins": 1}
+
 class User(BaseModel):
     id: str
     google_id: Optional[str] = None
@@ -12,6 +36,9 @@ class User(BaseModel):
     created_at: int
     updated_at: int
     is_active: bool = True
+    rating: float = 1500.0  # Elo, updated as games are settled
+    games_played: int = 0
+    wins: int = 0
 
 class UserInfo(BaseModel):
     id: str
@@ -20,6 +47,18 @@ class UserInfo(BaseModel):
     created_at: int
     updated_at: int
     is_active: bool = True
+    rating: float = 1500.0
+    games_played: int = 0
+    wins: int = 0
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int  # players with the same rating share a rank
+    id: str
+    name: str
+    rating: float
+    games_played: int = 0
+    wins: int = 0
 
 
 class CreateUserRequest(BaseModel):
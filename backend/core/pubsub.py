@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import uuid
+import weakref
+from collections import defaultdict
+from datetime import datetime as dt, timedelta as td, timezone as tz
+from backend.core.database import MongoAsyncClient
+from backend.core.model.pubsub import pubsub_collection
+
+logger = logging.getLogger(__name__)
+
+
+class PubSub:
+    """
+    Fire-and-forget messages between the workers of a deployment.
+    Handlers are async callables taking the message dict; a worker never
+    receives its own messages, it applies its changes locally instead.
+    """
+    # whether messages reach other processes, i.e. multi-worker deployments are consistent
+    shared = False
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self.handlers: dict[str, list] = defaultdict(list)
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, channel: str, handler):
+        self.handlers[channel].append(handler)
+
+    async def publish(self, channel: str, message: dict):
+        raise NotImplementedError
+
+    async def _dispatch(self, channel: str, origin: str, message: dict):
+        if origin == self.origin:
+            return
+        self.received += 1
+        for handler in self.handlers.get(channel, ()):
+            try:
+                await handler(message)
+            except Exception:
+                logger.exception("Handler of %s failed", channel)
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "shared": self.shared,
+            "published": self.published,
+            "received": self.received
+        }
+
+
+class InMemoryPubSub(PubSub):
+    """
+    Delivers to every other InMemoryPubSub of the process. Stands in for
+    the shared backend in single-worker runs and in tests, which create one
+    instance per simulated worker.
+    """
+    _instances = weakref.WeakSet()
+
+    def __init__(self):
+        super().__init__()
+        self._instances.add(self)
+        self._tasks = set()
+
+    async def publish(self, channel: str, message: dict):
+        self.published += 1
+        for pubsub in list(self._instances):
+            if pubsub is not self and channel in pubsub.handlers:
+                # delivered asynchronously, as over a real broker
+                task = asyncio.create_task(pubsub._dispatch(channel, self.origin, message))
+                pubsub._tasks.add(task)
+                task.add_done_callback(pubsub._tasks.discard)
+
+
+class MongoPubSub(PubSub):
+    """
+    Messages are inserted into a TTL collection and every worker follows
+    its inserts through a change stream, resuming after errors from the
+    last event seen. Change streams need a replica set or sharded cluster.
+    """
+    shared = True
+
+    def __init__(self, db: MongoAsyncClient = None, ttl: int = 60, retry_delay: float = 1.0):
+        super().__init__()
+        self.db = db or MongoAsyncClient()
+        self.ttl = ttl
+        self.retry_delay = retry_delay
+        self._task = None
+
+    async def publish(self, channel: str, message: dict):
+        self.published += 1
+        await self.db.insert_one(pubsub_collection, {
+            "channel": channel,
+            "origin": self.origin,
+            "message": message,
+            "expire_date": dt.now(tz.utc) + td(seconds=self.ttl)
+        })
+
+    async def _run(self):
+        resume_token = None
+        pipeline = [{"$match": {"operationType": "insert", "fullDocument.origin": {"$ne": self.origin}}}]
+        while True:
+            try:
+                async with self.db.watch(pubsub_collection, pipeline, resume_after=resume_token) as stream:
+                    async for change in stream:
+                        resume_token = change["_id"]
+                        event = change["fullDocument"]
+                        await self._dispatch(event["channel"], event["origin"], event["message"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Pub/sub change stream failed, resuming in %.1fs", self.retry_delay)
+                await asyncio.sleep(self.retry_delay)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def create_pubsub(backend: str = None) -> PubSub:
+    """The backend named by PUBSUB_BACKEND: memory (default, one worker) or mongo"""
+    backend = backend or os.getenv("PUBSUB_BACKEND", "memory")
+    if backend == "mongo":
+        return MongoPubSub()
+    if backend == "memory":
+        return InMemoryPubSub()
+    raise ValueError(f"Unknown pub/sub backend: {backend}")
+
+
+pubsub = create_pubsub()
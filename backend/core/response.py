@@ -0,0 +1,54 @@
+import json
+import logging
+from typing import Any, AsyncIterator
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from backend.core.metrics import span
+
+try:
+    import orjson
+except ImportError:  # falls back to the stdlib encoder
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by orjson when it is installed"""
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
+
+
+def ndjson_line(item: Any) -> bytes:
+    """One line of a newline-delimited JSON stream"""
+    if orjson is None:
+        return json.dumps(item).encode() + b"\n"
+    return orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE)
+
+
+async def ndjson_stream(items: AsyncIterator, what: str) -> AsyncIterator[bytes]:
+    """
+    The body of an application/x-ndjson StreamingResponse. The status line is
+    sent before the first item, so a failure midway is logged and ends the
+    body with an {"error"} line rather than a silently truncated stream.
+    """
+    try:
+        async for item in items:
+            yield ndjson_line(item)
+    except Exception as e:
+        logger.exception("Streaming %s failed", what)
+        yield ndjson_line({"error": str(e)})
+
+
+def envelope(data: Any, message: str, status_code: int = 200) -> FastJSONResponse:
+    """
+    The {"status", "data", "message"} body every router returns, encoded
+    directly: returning a Response skips FastAPI's response_model validation
+    and jsonable_encoder pass, the route's response_model only documents it.
+    """
+    with span("serialize"):
+        if isinstance(data, BaseModel):
+            data = data.model_dump()
+        return FastJSONResponse({"status": 1, "data": data, "message": message}, status_code=status_code)
@@ -0,0 +1,50 @@
+import asyncio
+import sys
+from collections import defaultdict
+from backend.core.database import MongoAsyncClient
+from backend.core.model.game import game_collection, GameType
+from backend.game.providers.board import unpack_moves
+from backend.game.providers.opening_book import SYMMETRIES, canonical, game_sequence, write_opening_book
+from backend.game.providers.zobrist import BOARD_SIZE
+
+
+async def build_opening_book(path: str, max_plies: int = 8, min_games: int = 2, batch_size: int = 1000) -> int:
+    """
+    Stream finished gomoku games and keep, for every canonical position of
+    the first max_plies plies, the reply that scored best for the side to move.
+    Returns the number of positions written.
+    """
+    db = MongoAsyncClient()
+    # canonical key -> canonical move -> [games, wins for the side that played it]
+    stats = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    async for games in db.iter_batches(
+        game_collection,
+        {"type": GameType.GOMOKU.value, "data.winner": {"$ne": None}},
+        {"_id": 0, "data.board": 1, "data.moves": 1, "data.winner": 1},
+        batch_size=batch_size
+    ):
+        for game in games:
+            position = {"black": [], "white": []}
+            board = unpack_moves(game["data"]["moves"]) if "moves" in game["data"] else game["data"]["board"]
+            for color, x, y in game_sequence(board)[:max_plies]:
+                key, sym = canonical(position)
+                tx, ty = SYMMETRIES[sym](x, y)
+                record = stats[key][tx * BOARD_SIZE + ty]
+                record[0] += 1
+                record[1] += game["data"]["winner"] == color
+                position[color].append([x, y])
+
+    book = {}
+    for key, replies in stats.items():
+        move, (games, wins) = max(replies.items(), key=lambda item: (item[1][1], item[1][0]))
+        if games >= min_games:
+            book[key] = (move, min(games, 0xFFFF))
+    write_opening_book(path, book, max_plies)
+    return len(book)
+
+
+if __name__ == "__main__":
+    # python -m backend.game.book_builder <output path> [max plies]
+    output = sys.argv[1] if len(sys.argv) > 1 else "backend/gomoku_openings.book"
+    plies = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    print(f"Wrote {asyncio.run(build_opening_book(output, plies))} positions to {output}")
@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import time
+import weakref
+from backend.core.cache import TTLCache
+from backend.core.database import MongoAsyncClient
+from backend.core.model.game import Game, game_collection
+from backend.game.move_log import MoveLog, MoveConflict
+from backend.game.providers.board import GomokuBoard, is_alternating, pack_move, pack_moves
+
+logger = logging.getLogger(__name__)
+
+
+class CachedGame:
+    """A live game plus its bitboard, so moves on it never rebuild the board"""
+    def __init__(self, game: Game):
+        self.game = game
+        self._board = None
+
+    @property
+    def board(self) -> GomokuBoard:
+        if self._board is None:
+            self._board = GomokuBoard.from_dict(self.game.data["board"])
+        return self._board
+
+
+class PendingMoves:
+    """Moves applied in memory but not yet written to Mongo"""
+    def __init__(self, entry: CachedGame, base_counts: dict, packed: bytes | None):
+        # the cached game the moves were applied to, kept even if the cache evicts it
+        self.entry = entry
+        # stone counts of the stored document these moves are appended to
+        self.base_counts = base_counts
+        # packed move sequence of the whole board, base plus pending moves
+        self.packed = packed
+        # copy of the whole board instead, when its stone counts do not alternate
+        self.board = None
+        # the pending moves in play order, as move log events
+        self.events = []
+        self.updated_at = None
+        self.winner = None
+        self.since = time.monotonic()
+
+    def merge(self, newer: "PendingMoves"):
+        self.entry = newer.entry
+        self.packed = newer.packed
+        self.board = newer.board
+        self.events.extend(newer.events)
+        self.updated_at = newer.updated_at
+        self.winner = newer.winner
+
+
+class GameCache:
+    """
+    LRU/TTL cache of active games with write-behind of their moves.
+    Moves are applied to the cached Game first and pushed to Mongo every
+    flush_interval seconds, or immediately through flush() / flush_game().
+    Writes of one game are serialized by a per-game lock, so they reach
+    Mongo in move order whichever path triggers them. on_decided(game_id)
+    is called once the winning move of a game is stored, on_conflict(game_id,
+    events) when pending moves could not be stored because the game changed.
+    """
+    def __init__(self, db: MongoAsyncClient, move_log: MoveLog, maxsize: int, ttl: float, flush_interval: float,
+                 on_decided=None, on_conflict=None):
+        self.db = db
+        self.move_log = move_log
+        self.on_decided = on_decided
+        self.on_conflict = on_conflict
+        self.games = TTLCache(maxsize, ttl)
+        self.flush_interval = flush_interval
+        self.pending: dict[str, PendingMoves] = {}
+        # game_id -> lock, dropped once no writer holds or waits on it
+        self._locks = weakref.WeakValueDictionary()
+        self._task = None
+        self.flushes = 0
+        self.flushed_moves = 0
+        self.flush_conflicts = 0
+        self.dropped_moves = 0
+        self.last_flush_lag = 0.0
+        self.max_flush_lag = 0.0
+
+    async def get(self, game_id: str, loader) -> CachedGame:
+        entry = self.games.get(game_id)
+        if entry is not None:
+            return entry
+
+        # under the write lock, so a flush in progress is stored before the game is re-read
+        async with self.lock(game_id):
+            # another request may have loaded it while we were waiting
+            entry = self.games.peek(game_id)
+            if entry is not None:
+                return entry
+            # a game evicted with moves still pending is written, and its copy served
+            # again: while the write fails that copy is the only one with those moves
+            pending = self.pending.get(game_id)
+            if pending is not None and await self._flush(game_id) is not False:
+                entry = pending.entry
+            else:
+                entry = CachedGame(await loader(game_id))
+            self.games.set(game_id, entry)
+        return entry
+
+    def put(self, game: Game) -> CachedGame:
+        entry = CachedGame(game)
+        self.games.set(game.id, entry)
+        return entry
+
+    def peek(self, game_id: str) -> CachedGame | None:
+        return self.games.peek(game_id)
+
+    def record_move(self, entry: CachedGame, color: str, x: int, y: int):
+        """Queue a move that was already applied to entry for the next flush"""
+        game = entry.game
+        board = game.data["board"]
+        pending = self.pending.get(game.id)
+        if pending is None:
+            base_counts = {c: len(board[c]) for c in GomokuBoard.COLORS}
+            base_counts[color] -= 1
+            packed = pack_moves(board) if is_alternating(board) else None
+            pending = self.pending[game.id] = PendingMoves(entry, base_counts, packed)
+        elif pending.packed is not None:
+            pending.packed += pack_move(x, y)
+        if pending.packed is None:
+            # games stored before turn order was enforced keep their board as is
+            pending.board = {c: [list(stone) for stone in board[c]] for c in GomokuBoard.COLORS}
+        pending.events.append({
+            "ply": len(game.data["board"]["black"]) + len(game.data["board"]["white"]),
+            "x": x,
+            "y": y,
+            "color": color,
+            "ts": game.updated_at
+        })
+        pending.entry = entry
+        pending.updated_at = game.updated_at
+        pending.winner = game.data["winner"]
+
+    def lock(self, game_id: str) -> asyncio.Lock:
+        """The lock serializing the writes of one game"""
+        lock = self._locks.get(game_id)
+        if lock is None:
+            lock = self._locks[game_id] = asyncio.Lock()
+        return lock
+
+    async def flush(self):
+        """Write every pending move to Mongo, one conditional update per game"""
+        if self.pending:
+            await asyncio.gather(*(self.flush_game(game_id) for game_id in list(self.pending)))
+
+    async def flush_game(self, game_id: str) -> bool | None:
+        """
+        Write the pending moves of one game. True once they are stored, False
+        when the stored game changed underneath and the cached copy was
+        dropped, None when the write failed and they wait for the next flush.
+        """
+        async with self.lock(game_id):
+            return await self._flush(game_id)
+
+    async def _flush(self, game_id: str) -> bool | None:
+        # callers hold the lock of the game
+        pending = self.pending.pop(game_id, None)
+        if pending is None:
+            return True
+        try:
+            return await self._write(game_id, pending)
+        except Exception as e:
+            logger.warning("Flush of game %s failed, retrying later: %s", game_id, e)
+            self._requeue(game_id, pending)
+            return None
+
+    async def _write(self, game_id: str, pending: PendingMoves) -> bool:
+        # the move log is written first: it is the durable record the game document is derived from
+        try:
+            await self.move_log.append(game_id, pending.events)
+        except MoveConflict:
+            self._conflict(game_id, pending)
+            return False
+
+        base_ply = sum(pending.base_counts.values())
+        if pending.packed is not None:
+            stones = {"$set": {"data.moves": pending.packed}, "$unset": {"data.board": ""}}
+        else:
+            stones = {"$set": {"data.board": pending.board}}
+        modified = await self.db.modify_one(
+            game_collection,
+            {
+                "id": game_id,
+                "data.winner": None,
+                "$or": [
+                    {"data.ply": base_ply},
+                    # games stored before moves were packed, converted on their next write
+                    {
+                        "data.ply": {"$exists": False},
+                        **{f"data.board.{color}": {"$size": count} for color, count in pending.base_counts.items()}
+                    }
+                ]
+            },
+            {
+                **stones,
+                "$set": {
+                    **stones["$set"],
+                    "data.ply": base_ply + len(pending.events),
+                    "updated_at": pending.updated_at,
+                    "data.winner": pending.winner,
+                    # a decided game is over and frees its search id
+                    "is_active": pending.winner is None
+                }
+            }
+        )
+        lag = time.monotonic() - pending.since
+        self.flushes += 1
+        self.last_flush_lag = lag
+        self.max_flush_lag = max(self.max_flush_lag, lag)
+        if not modified:
+            self._conflict(game_id, pending)
+            return False
+        self.flushed_moves += len(pending.events)
+        if pending.winner is not None and self.on_decided is not None:
+            self.on_decided(game_id)
+
+        try:
+            await self.move_log.snapshot_crossed(game_id, base_ply, base_ply + len(pending.events), pending.entry.game.data["board"])
+        except Exception:
+            # snapshots only speed up replays, the moves themselves are stored
+            logger.exception("Snapshot of game %s failed", game_id)
+        return True
+
+    def _conflict(self, game_id: str, pending: PendingMoves):
+        # the stored game moved on without us, drop our copy so it is re-read
+        self.flush_conflicts += 1
+        self.dropped_moves += len(pending.events)
+        self.games.pop(game_id)
+        logger.error(
+            "Dropped pending moves of game %s, stored game changed: %s",
+            game_id, [(e["ply"], e["color"], e["x"], e["y"]) for e in pending.events]
+        )
+        if self.on_conflict is not None:
+            self.on_conflict(game_id, pending.events)
+
+    def _requeue(self, game_id: str, pending: PendingMoves):
+        newer = self.pending.get(game_id)
+        if newer is not None:
+            pending.merge(newer)
+        self.pending[game_id] = pending
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Write-behind flush failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        oldest = min((p.since for p in self.pending.values()), default=None)
+        return {
+            **self.games.stats(),
+            "pending_games": len(self.pending),
+            "flushes": self.flushes,
+            "flushed_moves": self.flushed_moves,
+            "flush_conflicts": self.flush_conflicts,
+            "dropped_moves": self.dropped_moves,
+            "flush_lag": time.monotonic() - oldest if oldest is not None else 0.0,
+            "last_flush_lag": self.last_flush_lag,
+            "max_flush_lag": self.max_flush_lag
+        }
@@ -0,0 +1,39 @@
+import asyncio
+from collections import defaultdict
+from fastapi import WebSocket
+
+
+class GameHub:
+    """Open websockets per game, used to push move deltas to players and spectators"""
+    def __init__(self):
+        self.connections: dict[str, set[WebSocket]] = defaultdict(set)
+
+    async def connect(self, game_id: str, websocket: WebSocket):
+        await websocket.accept()
+        self.connections[game_id].add(websocket)
+
+    def disconnect(self, game_id: str, websocket: WebSocket):
+        sockets = self.connections.get(game_id)
+        if sockets is None:
+            return
+        sockets.discard(websocket)
+        if not sockets:
+            del self.connections[game_id]
+
+    async def publish(self, game_id: str, message: dict):
+        sockets = list(self.connections.get(game_id, ()))
+        if not sockets:
+            return
+        results = await asyncio.gather(
+            *(websocket.send_json(message) for websocket in sockets),
+            return_exceptions=True
+        )
+        for websocket, result in zip(sockets, results):
+            if isinstance(result, Exception):
+                self.disconnect(game_id, websocket)
+
+    def stats(self) -> dict:
+        return {
+            "games": len(self.connections),
+            "connections": sum(len(sockets) for sockets in self.connections.values())
+        }
@@ -0,0 +1,296 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime as dt, timedelta as td, timezone as tz
+from fastapi import HTTPException
+from backend.core.database import MongoAsyncClient
+from backend.core.pubsub import PubSub
+from backend.core.model.game import Game, GameType, match_ticket_collection
+
+logger = logging.getLogger(__name__)
+
+# pub/sub channel telling a worker that one of its tickets was matched elsewhere
+MATCHES_CHANNEL = "match.claimed"
+
+
+class MatchTicket:
+    def __init__(self, user_id: str, game_type: str, band: int | None):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.game_type = game_type
+        self.band = band
+        self.enqueued_at = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+        # waiting -> taken (a partner was found) or cancelled
+        self.state = "waiting"
+
+
+class MatchmakingQueue:
+    """
+    Pairs players per (game type, rating band).
+    Waiting tickets sit in one heap per key, oldest first, so pairing is a
+    heap pop. With shared=True every waiting ticket is also published to
+    the match_tickets collection: other workers claim it with one atomic
+    update and announce the match over pub/sub. Polling for claimed tickets
+    remains as a fallback, and is the only path without a shared pub/sub.
+    The poll also lets waiting tickets claim tickets published after their
+    own, which they missed when they were enqueued.
+    """
+    def __init__(self, db: MongoAsyncClient, create_game, load_game, shared: bool = True,
+                 poll_interval: float = 0.5, ticket_ttl: int = 120, pubsub: PubSub = None):
+        self.db = db
+        self.create_game = create_game  # async (p1_id, p2_id, game_type) -> Game
+        self.load_game = load_game  # async (game_id) -> Game
+        self.shared = shared
+        self.pubsub = pubsub
+        # announced matches arrive at once, the poll only catches lost announcements
+        if pubsub is not None and pubsub.shared:
+            poll_interval = max(poll_interval, 5.0)
+        self.poll_interval = poll_interval
+        self.ticket_ttl = ticket_ttl
+        self.worker_id = uuid.uuid4().hex
+        self.queues: dict[tuple, list] = defaultdict(list)
+        self.waiting: dict[str, MatchTicket] = {}
+        self._seq = itertools.count()
+        self._task = None
+        self.matches = 0
+        self.timeouts = 0
+        self.wait_times = deque(maxlen=1000)
+
+    async def find_match(self, user_id: str, game_type: GameType, band: int | None = None, timeout: float = 30.0) -> Game:
+        """Wait until the player is paired, and return the game created for both"""
+        if user_id in self.waiting:
+            raise HTTPException(status_code=400, detail="Already waiting for a match")
+
+        ticket = MatchTicket(user_id, game_type.value, band)
+        self.waiting[user_id] = ticket
+        try:
+            partner = await self._pop_partner((ticket.game_type, band))
+            if partner is not None:
+                return await self._pair(partner, ticket)
+
+            if self.shared:
+                game = await self._claim_remote(ticket)
+                if game is not None:
+                    return await self._done(ticket, game)
+                await self._publish(ticket)
+            game = await self._enqueue(ticket)
+            if game is not None:
+                return game
+
+            try:
+                return await asyncio.wait_for(asyncio.shield(ticket.future), timeout)
+            except asyncio.TimeoutError:
+                if await self._take(ticket, "cancelled"):
+                    self.timeouts += 1
+                    raise HTTPException(status_code=408, detail="No opponent found, please try again")
+                # a partner took the ticket at the last moment, its game is on the way
+                return await asyncio.wait_for(ticket.future, self.poll_interval * 4 + 5)
+        finally:
+            if self.waiting.get(user_id) is ticket:
+                del self.waiting[user_id]
+
+    async def _take(self, ticket: MatchTicket, state: str) -> bool:
+        """Atomically move a waiting ticket out of the queue; False if someone else got it first"""
+        if ticket.state != "waiting":
+            return False
+        ticket.state = state
+        if not self.shared:
+            return True
+        taken = await self.db.find_one_and_update(
+            match_ticket_collection,
+            {"_id": ticket.id, "status": "waiting"},
+            {"$set": {"status": state}}
+        )
+        if taken is None:
+            # claimed by another worker, the poller will hand over its game
+            ticket.state = "waiting"
+            return False
+        return True
+
+    async def _pop_partner(self, key: tuple) -> MatchTicket | None:
+        queue = self.queues.get(key)
+        while queue:
+            _, _, candidate = heapq.heappop(queue)
+            if await self._take(candidate, "taken"):
+                return candidate
+        return None
+
+    async def _enqueue(self, ticket: MatchTicket) -> Game | None:
+        """
+        Queue the ticket, unless a local player queued for the same key while
+        it was being published: then the two are paired here, as nothing
+        else pairs tickets that are both waiting already.
+        """
+        key = (ticket.game_type, ticket.band)
+        while self.queues.get(key):
+            if not await self._take(ticket, "taken"):
+                # claimed by another worker meanwhile, its game is announced to us
+                return None
+            partner = await self._pop_partner(key)
+            if partner is not None:
+                return await self._pair(partner, ticket)
+            # only stale tickets were queued, put ours back up for grabs and look again
+            ticket.state = "waiting"
+            if self.shared:
+                await self.db.update_one(match_ticket_collection, {"_id": ticket.id}, {"status": "waiting"})
+        heapq.heappush(self.queues[key], (ticket.enqueued_at, next(self._seq), ticket))
+        return None
+
+    async def _pair(self, waiting: MatchTicket, ticket: MatchTicket) -> Game:
+        try:
+            game = await self.create_game(waiting.user_id, ticket.user_id, GameType(ticket.game_type))
+        except Exception as e:
+            if not waiting.future.done():
+                waiting.future.set_exception(e)
+            raise
+        await self._done(waiting, game)
+        return await self._done(ticket, game)
+
+    async def _done(self, ticket: MatchTicket, game: Game) -> Game:
+        if not ticket.future.done():
+            ticket.future.set_result(game)
+        self.matches += 1
+        self.wait_times.append(time.monotonic() - ticket.enqueued_at)
+        return game
+
+    async def _publish(self, ticket: MatchTicket):
+        now = dt.now(tz.utc)
+        await self.db.insert_one(match_ticket_collection, {
+            "_id": ticket.id,
+            "user_id": ticket.user_id,
+            "type": ticket.game_type,
+            "band": ticket.band,
+            "worker": self.worker_id,
+            "status": "waiting",
+            "game_id": None,
+            "created_at": int(now.timestamp()),
+            "expire_date": now + td(seconds=self.ticket_ttl)
+        })
+
+    async def _claim_remote(self, ticket: MatchTicket, below: str = None) -> Game | None:
+        filter = {
+            "status": "waiting",
+            "type": ticket.game_type,
+            "band": ticket.band,
+            "worker": {"$ne": self.worker_id},
+            "user_id": {"$ne": ticket.user_id}
+        }
+        if below is not None:
+            filter["_id"] = {"$lt": below}
+        claimed = await self.db.find_one_and_update(
+            match_ticket_collection,
+            filter,
+            {"$set": {"status": "claimed"}},
+            sort=[("created_at", 1)]
+        )
+        if claimed is None:
+            return None
+        try:
+            game = await self.create_game(claimed["user_id"], ticket.user_id, GameType(ticket.game_type))
+        except Exception:
+            await self.db.update_one(match_ticket_collection, {"_id": claimed["_id"]}, {"status": "waiting"})
+            raise
+        await self.db.update_one(match_ticket_collection, {"_id": claimed["_id"]}, {"status": "matched", "game_id": game.id})
+        if self.pubsub is not None:
+            await self.pubsub.publish(MATCHES_CHANNEL, {"worker": claimed["worker"], "ticket_id": claimed["_id"], "game_id": game.id})
+        return game
+
+    async def on_remote_match(self, message: dict):
+        if message["worker"] != self.worker_id:
+            return
+        await self._resolve_remote(message["ticket_id"], message["game_id"])
+
+    async def _resolve_remote(self, ticket_id: str, game_id: str):
+        """Hand the game another worker created to the local ticket it was made for"""
+        await self.db.delete_one(match_ticket_collection, {"_id": ticket_id})
+        ticket = next((t for t in self.waiting.values() if t.id == ticket_id), None)
+        if ticket is None or ticket.future.done():
+            return
+        ticket.state = "taken"
+        await self._done(ticket, await self.load_game(game_id))
+
+    async def rescan_waiting(self):
+        """
+        Let local tickets still waiting claim a published ticket: two players
+        enqueued on different workers at the same time each missed the other.
+        Only tickets with a smaller id are claimed, so of two tickets exactly
+        one claims the other, and the claimer takes its own ticket first so
+        it cannot be claimed meanwhile.
+        """
+        for ticket in list(self.waiting.values()):
+            if ticket.state != "waiting" or ticket.future.done():
+                continue
+            if not await self._take(ticket, "taken"):
+                # claimed by another worker meanwhile, its game is announced to us
+                continue
+            try:
+                game = await self._claim_remote(ticket, below=ticket.id)
+            except Exception:
+                logger.exception("Rescan of match ticket %s failed", ticket.id)
+                game = None
+            if game is not None:
+                await self._done(ticket, game)
+                continue
+            ticket.state = "waiting"
+            await self.db.update_one(match_ticket_collection, {"_id": ticket.id}, {"status": "waiting"})
+            # a local player may have popped and discarded it from the heap while it was taken
+            queue = self.queues[(ticket.game_type, ticket.band)]
+            if not any(queued is ticket for _, _, queued in queue):
+                heapq.heappush(queue, (ticket.enqueued_at, next(self._seq), ticket))
+
+    async def poll_remote_matches(self):
+        """Resolve local tickets that another worker claimed and matched"""
+        if not self.waiting:
+            return
+        matched = await self.db.find_many(
+            match_ticket_collection,
+            {"worker": self.worker_id, "status": "matched"}
+        )
+        for doc in matched:
+            await self._resolve_remote(doc["_id"], doc["game_id"])
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll_remote_matches()
+                await self.rescan_waiting()
+            except Exception:
+                logger.exception("Matchmaking poll failed")
+
+    def start(self):
+        if self.shared and self._task is None:
+            if self.pubsub is not None:
+                self.pubsub.subscribe(MATCHES_CHANNEL, self.on_remote_match)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        waits = sorted(self.wait_times)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(p * len(waits)))]
+
+        return {
+            "waiting": len(self.waiting),
+            "matches": self.matches,
+            "timeouts": self.timeouts,
+            "wait_p50": percentile(0.50),
+            "wait_p90": percentile(0.90),
+            "wait_p99": percentile(0.99)
+        }
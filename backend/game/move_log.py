@@ -0,0 +1,109 @@
+from pymongo.errors import BulkWriteError
+from backend.core.database import MongoAsyncClient
+from backend.core.model.game import game_move_collection, game_snapshot_collection, SNAPSHOT_INTERVAL
+
+
+def board_at(board: dict, ply: int) -> dict:
+    """The position after the first ply moves; stones of each color are stored in play order"""
+    return {
+        "black": [list(stone) for stone in board["black"][:(ply + 1) // 2]],
+        "white": [list(stone) for stone in board["white"][:ply // 2]]
+    }
+
+
+DUPLICATE_KEY = 11000
+
+
+class MoveConflict(Exception):
+    """Another writer already recorded a different move for one of the plies"""
+
+
+class MoveLogGap(Exception):
+    """A ply is missing from the middle of a game's log"""
+
+
+class MoveLog:
+    """
+    Append-only move events (game_id, ply, x, y, color, ts) with a board
+    snapshot every SNAPSHOT_INTERVAL plies. The unique (game_id, ply) index
+    means two writers can never record different moves for the same ply.
+    """
+    def __init__(self, db: MongoAsyncClient):
+        self.db = db
+
+    async def append(self, game_id: str, events: list[dict]):
+        """
+        events are {"ply", "x", "y", "color", "ts"} in ply order. Appending
+        the same events again (a retried flush, maybe with newer moves merged
+        in) only writes the plies not stored yet.
+        """
+        try:
+            # unordered, so the plies past an already stored one are still written
+            await self.db.insert_many(
+                game_move_collection,
+                [{"game_id": game_id, **event} for event in events],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            if any(error["code"] != DUPLICATE_KEY for error in e.details.get("writeErrors", ())):
+                raise
+            stored = await self.db.find_many(
+                game_move_collection,
+                {"game_id": game_id, "ply": {"$in": [event["ply"] for event in events]}}
+            )
+            stored = {event["ply"]: (event["x"], event["y"], event["color"]) for event in stored}
+            if any(e["ply"] in stored and stored[e["ply"]] != (e["x"], e["y"], e["color"]) for e in events):
+                raise MoveConflict(f"Game {game_id} has other moves recorded for these plies")
+
+    async def snapshot(self, game_id: str, ply: int, board: dict):
+        await self.db.modify_one(
+            game_snapshot_collection,
+            {"game_id": game_id, "ply": ply},
+            {"$setOnInsert": {"game_id": game_id, "ply": ply, "board": board_at(board, ply)}},
+            upsert=True
+        )
+
+    async def snapshot_crossed(self, game_id: str, from_ply: int, to_ply: int, board: dict):
+        """Snapshot every multiple of SNAPSHOT_INTERVAL in (from_ply, to_ply]; board must reach to_ply"""
+        first = (from_ply // SNAPSHOT_INTERVAL + 1) * SNAPSHOT_INTERVAL
+        for ply in range(first, to_ply + 1, SNAPSHOT_INTERVAL):
+            await self.snapshot(game_id, ply, board)
+
+    async def replay(self, game_id: str, from_ply: int = 0):
+        """
+        Yield (ply, event, board) for every ply from from_ply on, where board
+        is a copy of the position after that ply. Starts from the nearest snapshot, so
+        rebuilding any position reads at most SNAPSHOT_INTERVAL events.
+        Yields nothing when the log does not reach back to that snapshot or
+        the start, as for games begun before the move log existed, and
+        raises MoveLogGap when a ply is missing further on.
+        """
+        snapshots = await self.db.find_many(
+            game_snapshot_collection,
+            {"game_id": game_id, "ply": {"$lt": from_ply}},
+            {"_id": 0},
+            sort=[("ply", -1)],
+            limit=1
+        )
+        if snapshots:
+            ply, board = snapshots[0]["ply"], snapshots[0]["board"]
+        else:
+            ply, board = 0, {"black": [], "white": []}
+
+        async for events in self.db.iter_batches(
+            game_move_collection,
+            {"game_id": game_id, "ply": {"$gt": ply}},
+            {"_id": 0, "game_id": 0},
+            batch_size=SNAPSHOT_INTERVAL * 5,
+            sort=[("ply", 1)]
+        ):
+            for event in events:
+                if event["ply"] != ply + 1:
+                    # a log beginning late belongs to a game older than the log itself
+                    if ply == 0:
+                        return
+                    raise MoveLogGap(f"Game {game_id} has no move logged for ply {ply + 1}")
+                ply = event["ply"]
+                board[event["color"]].append([event["x"], event["y"]])
+                if ply >= from_ply:
+                    yield ply, event, {color: list(stones) for color, stones in board.items()}
@@ -0,0 +1,181 @@
+import sys
+from array import array
+from backend.game.providers.zobrist import zobrist_key
+
+
+def _cells(data) -> array:
+    cells = array("H")
+    cells.frombytes(bytes(data))
+    if sys.byteorder == "big":
+        cells.byteswap()
+    return cells
+
+
+def _to_bytes(cells: array) -> bytes:
+    if sys.byteorder == "big":
+        cells.byteswap()
+    return cells.tobytes()
+
+
+class GomokuBoard:
+    """
+    Compact bitboard for a 19x19 gomoku board.
+
+    Each color is a single Python int. Cell (x, y) lives at bit x * STRIDE + y;
+    the extra column per row (y == 19) is always empty so that shifting a
+    board never carries stones across a row edge.
+    """
+    SIZE = 19
+    STRIDE = SIZE + 1
+    COLORS = ("black", "white")
+
+    # bit shifts for the 4 line axes: along y, along x, diagonal, anti-diagonal
+    DIRECTIONS = (1, STRIDE, STRIDE + 1, STRIDE - 1)
+
+    # width of one board when many are packed into a single int; the gap above
+    # the last row is wider than the largest shift used by five_mask
+    PACKED_WIDTH = 512
+
+    def __init__(self):
+        self.bits = {"black": 0, "white": 0}
+        # move order per color, kept so the stored dict round-trips exactly
+        self.moves = {"black": [], "white": []}
+        # zobrist hash of the position, updated on every place
+        self.hash = 0
+
+    @classmethod
+    def index(cls, x: int, y: int) -> int:
+        return x * cls.STRIDE + y
+
+    @classmethod
+    def coords(cls, idx: int) -> tuple[int, int]:
+        return divmod(idx, cls.STRIDE)
+
+    @classmethod
+    def in_bounds(cls, x: int, y: int) -> bool:
+        return 0 <= x < cls.SIZE and 0 <= y < cls.SIZE
+
+    @classmethod
+    def from_dict(cls, board: dict) -> "GomokuBoard":
+        """Build from the stored {"black": [[x, y], ...], "white": [...]} shape"""
+        bb = cls()
+        for color in cls.COLORS:
+            for x, y in board.get(color, []):
+                bb.place(color, x, y)
+        return bb
+
+    def to_dict(self) -> dict:
+        return {
+            color: [list(self.coords(idx)) for idx in self.moves[color]]
+            for color in self.COLORS
+        }
+
+    @classmethod
+    def from_packed(cls, data: bytes) -> "GomokuBoard":
+        """Build from a packed move sequence, see pack_moves"""
+        bb = cls()
+        for ply, cell in enumerate(_cells(data)):
+            bb.place(cls.COLORS[ply % 2], *divmod(cell, cls.SIZE))
+        return bb
+
+    @property
+    def occupied(self) -> int:
+        return self.bits["black"] | self.bits["white"]
+
+    @property
+    def move_count(self) -> int:
+        return len(self.moves["black"]) + len(self.moves["white"])
+
+    def is_empty(self, x: int, y: int) -> bool:
+        return not (self.occupied >> self.index(x, y)) & 1
+
+    def color_at(self, x: int, y: int) -> str | None:
+        mask = 1 << self.index(x, y)
+        for color in self.COLORS:
+            if self.bits[color] & mask:
+                return color
+        return None
+
+    def place(self, color: str, x: int, y: int):
+        if not self.in_bounds(x, y):
+            raise ValueError(f"Out of board: {x}, {y}")
+        idx = self.index(x, y)
+        if (self.occupied >> idx) & 1:
+            raise ValueError(f"Cell already occupied: {x}, {y}")
+        self.bits[color] |= 1 << idx
+        self.moves[color].append(idx)
+        self.hash ^= zobrist_key(color, x, y)
+
+    def is_five_at(self, color: str, x: int, y: int) -> bool:
+        """Whether the stone at (x, y) is part of five or more in a row"""
+        bits = self.bits[color]
+        idx = self.index(x, y)
+        for shift in self.DIRECTIONS:
+            count = 1
+            pos = idx + shift
+            while (bits >> pos) & 1:
+                count += 1
+                pos += shift
+            pos = idx - shift
+            while pos >= 0 and (bits >> pos) & 1:
+                count += 1
+                pos -= shift
+            if count >= 5:
+                return True
+        return False
+
+    @classmethod
+    def five_mask(cls, bits: int) -> int:
+        """Bits that start a run of five or more, along any axis"""
+        mask = 0
+        for shift in cls.DIRECTIONS:
+            # fold twice: a set bit in quads starts a run of at least 4
+            pairs = bits & (bits >> shift)
+            quads = pairs & (pairs >> 2 * shift)
+            mask |= quads & (bits >> 4 * shift)
+        return mask
+
+    @classmethod
+    def has_five(cls, bits: int) -> bool:
+        """Bit-parallel five-in-a-row test over the whole board for one color"""
+        return cls.five_mask(bits) != 0
+
+
+def is_alternating(board: dict) -> bool:
+    """
+    Whether the stone counts fit alternating plies, black first: only then
+    does a packed sequence give every stone back its color. Boards stored
+    before turn order was enforced may not.
+    """
+    return 0 <= len(board["black"]) - len(board["white"]) <= 1
+
+
+def pack_moves(board: dict) -> bytes:
+    """
+    Packed move sequence of a stored board: one little-endian uint16 cell
+    (x * SIZE + y) per ply in play order, black first. A full 19x19 game
+    is at most 722 bytes instead of a few KB of nested JSON lists.
+    """
+    if not is_alternating(board):
+        raise ValueError("Stone counts do not alternate, the board cannot be packed")
+    black, white = board["black"], board["white"]
+    cells = array("H")
+    for i, (x, y) in enumerate(black):
+        cells.append(x * GomokuBoard.SIZE + y)
+        if i < len(white):
+            cells.append(white[i][0] * GomokuBoard.SIZE + white[i][1])
+    return _to_bytes(cells)
+
+
+def pack_move(x: int, y: int) -> bytes:
+    """One ply of a packed move sequence, so sequences can be extended by concatenation"""
+    return _to_bytes(array("H", [x * GomokuBoard.SIZE + y]))
+
+
+def unpack_moves(data: bytes) -> dict:
+    """The {"black": [[x, y], ...], "white": [...]} board of a packed move sequence"""
+    cells = _cells(data)
+    return {
+        color: [list(divmod(cell, GomokuBoard.SIZE)) for cell in cells[ply::2]]
+        for ply, color in enumerate(GomokuBoard.COLORS)
+    }
@@ -1,56 +1,122 @@
+import base64
+from backend.game.providers.board import GomokuBoard, is_alternating, pack_moves, unpack_moves
+from backend.game.providers.opening_book import OpeningBook
+
+
 class Gomoku:
-    BOARD_SIZE = 19
+    BOARD_SIZE = GomokuBoard.SIZE
+
+    def __init__(self, opening_book: OpeningBook = None):
+        self.opening_book = opening_book
 
     def create_board(self):
         return {
             "black": [],
             "white": []
         }
-    
-    def is_valid_move(self, board: dict, x: int, y: int) -> bool:
-        if x < 0 or x > self.BOARD_SIZE - 1 or y < 0 or y > self.BOARD_SIZE - 1:
+
+    def load_board(self, board) -> GomokuBoard:
+        """Convert a board dict, packed move bytes or their base64 text into a bitboard"""
+        if isinstance(board, dict):
+            return GomokuBoard.from_dict(board)
+        if isinstance(board, str):
+            board = base64.b64decode(board)
+        return GomokuBoard.from_packed(board)
+
+    def can_pack_board(self, board: dict) -> bool:
+        return is_alternating(board)
+
+    def pack_board(self, board: dict) -> bytes:
+        return pack_moves(board)
+
+    def unpack_board(self, board) -> dict:
+        """Board dict of packed move bytes or their base64 text; dicts are returned as they are"""
+        if isinstance(board, dict):
+            return board
+        if isinstance(board, str):
+            board = base64.b64decode(board)
+        return unpack_moves(board)
+
+    def compact_board(self, board: dict) -> str:
+        """Packed moves as base64 text, the compact wire format of a board"""
+        return base64.b64encode(pack_moves(board)).decode("ascii")
+
+    def _as_bitboard(self, board) -> GomokuBoard:
+        if isinstance(board, GomokuBoard):
+            return board
+        return self.load_board(board)
+
+    def book_move(self, board: dict) -> tuple[int, int] | None:
+        """Reply from the opening book during the first plies, None when out of book"""
+        if self.opening_book is None:
+            return None
+        return self.opening_book.lookup(board)
+
+    def is_valid_move(self, board, x: int, y: int) -> bool:
+        if not GomokuBoard.in_bounds(x, y):
             return False
-        
+        if isinstance(board, GomokuBoard):
+            return board.is_empty(x, y)
+        # one lookup on a stored dict: scanning its lists beats building a bitboard
         return [x, y] not in board["black"] and [x, y] not in board["white"]
-    
-    def move(self, board: dict, color: str, x: int, y: int) -> dict:
+
+    def move(self, board, color: str, x: int, y: int):
+        """
+        Place a stone and report whether it wins.
+        Accepts either the stored board dict (appended in place) or a GomokuBoard.
+        """
         if not self.is_valid_move(board, x, y):
             raise ValueError(f"Invalid move: {x}, {y}, {color}")
-        
-        if color == "black":
-            board["black"].append([x, y])
+
+        if isinstance(board, GomokuBoard):
+            board.place(color, x, y)
         else:
-            board["white"].append([x, y])
+            board[color].append([x, y])
 
         is_win = self.check_win_with_last_move(board, color, x, y)
         return board, is_win
-    
-    def check_win_with_last_move(self, board: dict, color: str, last_x: int, last_y: int) -> bool:
-        directions = [
-            (1, 0),
-            (0, 1),
-            (-1, 0),
-            (0, -1),
-            (1, 1),
-            (-1, -1),
-            (1, -1),
-            (-1, 1)
-        ]
-        pieces = board[color]
-        for dx, dy in directions:
+
+    def check_win_with_last_move(self, board, color: str, last_x: int, last_y: int) -> bool:
+        if isinstance(board, GomokuBoard):
+            return board.is_five_at(color, last_x, last_y)
+
+        # stored dict: a set of one color's stones, then at most 8 lookups per axis
+        stones = {(x, y) for x, y in board[color]}
+        for dx, dy in ((0, 1), (1, 0), (1, 1), (1, -1)):
             count = 1
-            for i in range(1, 5):
-                x = last_x + dx * i
-                y = last_y + dy * i
-                if [x, y] in pieces:
+            for sign in (1, -1):
+                for i in range(1, 5):
+                    if (last_x + sign * dx * i, last_y + sign * dy * i) not in stones:
+                        break
                     count += 1
-                else:
-                    break
             if count >= 5:
                 return True
         return False
-        
-    
-    def check_win(self, board: dict) -> str:
-        """Accept a board data and use DFS to check whether a player wins"""
-        raise NotImplementedError("Not implemented")
\ No newline at end of file
+
+    def check_win(self, board) -> str | None:
+        """Scan the whole board and return the color holding five in a row, if any"""
+        bitboard = self._as_bitboard(board)
+        for color in GomokuBoard.COLORS:
+            if GomokuBoard.has_five(bitboard.bits[color]):
+                return color
+        return None
+
+    def check_win_many(self, boards) -> list[str | None]:
+        """
+        Batch version of check_win, used to re-validate stored boards.
+        All boards are packed side by side into one int per color so the
+        shift/mask scan runs once for the whole batch.
+        """
+        bitboards = [self._as_bitboard(board) for board in boards]
+        results = [None] * len(bitboards)
+        width = GomokuBoard.PACKED_WIDTH // 8
+        for color in reversed(GomokuBoard.COLORS):
+            packed = int.from_bytes(
+                b"".join(bb.bits[color].to_bytes(width, "little") for bb in bitboards),
+                "little"
+            )
+            mask = GomokuBoard.five_mask(packed).to_bytes(width * len(bitboards), "little")
+            for i in range(len(bitboards)):
+                if any(mask[i * width:(i + 1) * width]):
+                    results[i] = color
+        return results
@@ -0,0 +1,305 @@
+import os
+import re
+import time
+from backend.game.providers.board import GomokuBoard
+from backend.game.providers.zobrist import ZOBRIST_KEYS, TranspositionTable
+
+SIZE = GomokuBoard.SIZE
+
+# (name, alternatives, score) matched on a line where X is the scored color,
+# O the opponent or the board edge and . an empty cell
+PATTERNS = [
+    ("five", ["XXXXX"], 1_000_000),
+    ("open_four", [".XXXX."], 100_000),
+    ("four", ["XXXX.", ".XXXX", "XXX.X", "X.XXX", "XX.XX"], 10_000),
+    ("open_three", [".XXX."], 5_000),
+    ("broken_three", [".XX.X.", ".X.XX."], 4_000),
+    ("closed_three", ["OXXX..", "..XXXO", "OXX.X.", ".X.XXO", "OX.XX.", ".XX.XO", "X..XX", "XX..X", "X.X.X"], 500),
+    ("open_two", ["..XX..", ".X.X.", ".X..X."], 200),
+    ("closed_two", ["OXX...", "...XXO", "OX.X..", "..X.XO"], 20),
+]
+_PATTERN_RES = [
+    (re.compile("(?=(?:" + "|".join(re.escape(alt) for alt in alternatives) + "))"), score)
+    for _, alternatives, score in PATTERNS
+]
+
+WIN_SCORE = 10_000_000
+INF = WIN_SCORE * 10
+
+
+def _build_lines():
+    """Cell indices (x * SIZE + y) of every row, column and diagonal long enough to hold five"""
+    lines = []
+    for i in range(SIZE):
+        lines.append([i * SIZE + y for y in range(SIZE)])
+        lines.append([x * SIZE + i for x in range(SIZE)])
+    for start in range(-(SIZE - 5), SIZE - 4):
+        lines.append([x * SIZE + x - start for x in range(SIZE) if 0 <= x - start < SIZE])
+    for total in range(4, 2 * SIZE - 5):
+        lines.append([x * SIZE + total - x for x in range(SIZE) if 0 <= total - x < SIZE])
+    return lines
+
+
+LINES = _build_lines()
+CELL_LINES = [[] for _ in range(SIZE * SIZE)]
+for _line_id, _line in enumerate(LINES):
+    for _idx in _line:
+        CELL_LINES[_idx].append(_line_id)
+
+NEIGHBOURS = [
+    [
+        nx * SIZE + ny
+        for nx in range(x - 2, x + 3) for ny in range(y - 2, y + 3)
+        if 0 <= nx < SIZE and 0 <= ny < SIZE and (nx, ny) != (x, y)
+    ]
+    for x in range(SIZE) for y in range(SIZE)
+]
+
+COLOR_CHARS = {"black": "b", "white": "w"}
+OPPONENT = {"b": "w", "w": "b"}
+_AS_BLACK = str.maketrans({"b": "X", "w": "O"})
+_AS_WHITE = str.maketrans({"w": "X", "b": "O"})
+_KEYS = {"b": ZOBRIST_KEYS["black"], "w": ZOBRIST_KEYS["white"]}
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Position:
+    """
+    Mutable search position. Line scores are cached per line and only the
+    4 lines through a changed cell are rescored, so evaluation is incremental.
+    """
+    def __init__(self, board: dict, line_cache: dict):
+        self.cells = ["."] * (SIZE * SIZE)
+        self.near = [0] * (SIZE * SIZE)
+        self.line_cache = line_cache
+        self.history = []
+        self.hash = 0
+        for color, char in COLOR_CHARS.items():
+            for x, y in board.get(color, []):
+                self._set(x * SIZE + y, char)
+                self.hash ^= _KEYS[char][x * SIZE + y]
+        self.line_scores = [self.score_line(line_id) for line_id in range(len(LINES))]
+        self.totals = {
+            "b": sum(score[0] for score in self.line_scores),
+            "w": sum(score[1] for score in self.line_scores)
+        }
+
+    def _set(self, idx: int, char: str):
+        self.cells[idx] = char
+        step = 1 if char != "." else -1
+        for neighbour in NEIGHBOURS[idx]:
+            self.near[neighbour] += step
+
+    def line_string(self, line_id: int) -> str:
+        cells = self.cells
+        return "".join([cells[idx] for idx in LINES[line_id]])
+
+    def score_line(self, line_id: int) -> tuple[int, int]:
+        line = self.line_string(line_id)
+        cached = self.line_cache.get(line)
+        if cached is None:
+            cached = (self._pattern_score(line.translate(_AS_BLACK)), self._pattern_score(line.translate(_AS_WHITE)))
+            self.line_cache[line] = cached
+        return cached
+
+    @staticmethod
+    def _pattern_score(line: str) -> int:
+        if "X" not in line:
+            return 0
+        line = "O" + line + "O"
+        return sum(len(pattern.findall(line)) * score for pattern, score in _PATTERN_RES)
+
+    def _rescore(self, idx: int):
+        for line_id in CELL_LINES[idx]:
+            old_black, old_white = self.line_scores[line_id]
+            new_black, new_white = self.line_scores[line_id] = self.score_line(line_id)
+            self.totals["b"] += new_black - old_black
+            self.totals["w"] += new_white - old_white
+
+    def place(self, idx: int, char: str):
+        self._set(idx, char)
+        self._rescore(idx)
+        self.hash ^= _KEYS[char][idx]
+        self.history.append(idx)
+
+    def undo(self):
+        idx = self.history.pop()
+        self.hash ^= _KEYS[self.cells[idx]][idx]
+        self._set(idx, ".")
+        self._rescore(idx)
+
+    def is_five(self, idx: int, char: str) -> bool:
+        run = char * 5
+        return any(run in self.line_string(line_id) for line_id in CELL_LINES[idx])
+
+    def evaluate(self, char: str) -> int:
+        return self.totals[char] - self.totals[OPPONENT[char]]
+
+    def candidates(self) -> list[int]:
+        """Empty cells within two steps of a stone, or the centre on an empty board"""
+        cells, near = self.cells, self.near
+        moves = [idx for idx in range(SIZE * SIZE) if near[idx] and cells[idx] == "."]
+        if not moves and cells[(SIZE // 2) * SIZE + SIZE // 2] == ".":
+            moves = [(SIZE // 2) * SIZE + SIZE // 2]
+        return moves
+
+
+class GomokuAI:
+    """Iterative-deepening alpha-beta search over pattern-scored positions"""
+    def __init__(self, max_candidates: int = 12, max_depth: int = 8, tt_bits: int = 18):
+        self.max_candidates = max_candidates
+        self.max_depth = max_depth
+        # kept across searches: deepening passes, later moves and other games reuse it
+        self.tt = TranspositionTable(tt_bits)
+        self.last_search = {}
+        # line string -> (black score, white score), shared by every search of this instance
+        self.line_cache = {}
+        self.max_line_cache = 200_000
+        self._deadline = 0.0
+        self.nodes = 0
+
+    def _ordered_moves(self, pos: Position, char: str) -> list[int]:
+        """Candidates sorted by own gain plus the gain they deny the opponent"""
+        opponent = OPPONENT[char]
+        scored = []
+        for idx in pos.candidates():
+            before_own, before_opp = pos.totals[char], pos.totals[opponent]
+            pos.place(idx, char)
+            gain = pos.totals[char] - before_own
+            pos.undo()
+            pos.place(idx, opponent)
+            block = pos.totals[opponent] - before_opp
+            pos.undo()
+            scored.append((gain + block, idx))
+        scored.sort(reverse=True)
+        return [idx for _, idx in scored[:self.max_candidates]]
+
+    def _negamax(self, pos: Position, char: str, depth: int, alpha: int, beta: int) -> int:
+        self.nodes += 1
+        if time.monotonic() > self._deadline:
+            raise SearchTimeout()
+        if depth == 0:
+            return pos.evaluate(char)
+
+        alpha_orig = alpha
+        tt_move = None
+        entry = self.tt.get(pos.hash)
+        if entry is not None:
+            _, tt_depth, tt_value, flag, tt_move, _ = entry
+            if tt_depth >= depth:
+                if flag == TranspositionTable.EXACT:
+                    return tt_value
+                if flag == TranspositionTable.LOWER:
+                    alpha = max(alpha, tt_value)
+                else:
+                    beta = min(beta, tt_value)
+                if alpha >= beta:
+                    return tt_value
+
+        moves = self._ordered_moves(pos, char)
+        if not moves:
+            return 0
+        if tt_move is not None and pos.cells[tt_move] == ".":
+            if tt_move in moves:
+                moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        best, best_move = -INF, moves[0]
+        for idx in moves:
+            pos.place(idx, char)
+            if pos.is_five(idx, char):
+                value = WIN_SCORE + depth
+            else:
+                value = -self._negamax(pos, OPPONENT[char], depth - 1, -beta, -alpha)
+            pos.undo()
+            if value > best:
+                best, best_move = value, idx
+            if best > alpha:
+                alpha = best
+            if alpha >= beta:
+                break
+
+        if best <= alpha_orig:
+            flag = TranspositionTable.UPPER
+        elif best >= beta:
+            flag = TranspositionTable.LOWER
+        else:
+            flag = TranspositionTable.EXACT
+        self.tt.put(pos.hash, depth, best, flag, best_move)
+        return best
+
+    def _search_root(self, pos: Position, char: str, depth: int, moves: list[int]) -> tuple[int, int]:
+        best_move, best = moves[0], -INF
+        alpha = -INF
+        for idx in moves:
+            pos.place(idx, char)
+            if pos.is_five(idx, char):
+                value = WIN_SCORE + depth
+            else:
+                value = -self._negamax(pos, OPPONENT[char], depth - 1, -INF, -alpha)
+            pos.undo()
+            if value > best:
+                best, best_move = value, idx
+                alpha = max(alpha, best)
+        return best_move, best
+
+    def choose_move(self, board: dict, color: str, time_budget: float) -> tuple[int, int]:
+        """Best move found for color within time_budget seconds"""
+        if len(self.line_cache) > self.max_line_cache:
+            self.line_cache.clear()
+        started = time.monotonic()
+        self._deadline = started + time_budget
+        self.nodes = 0
+        self.tt.new_search()
+        char = COLOR_CHARS[color]
+        pos = Position(board, self.line_cache)
+
+        moves = self._ordered_moves(pos, char)
+        if not moves:
+            raise ValueError("No legal move left")
+        best_move = moves[0]
+        completed_depth = 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                move, value = self._search_root(pos, char, depth, moves)
+            except SearchTimeout:
+                break
+            best_move = move
+            completed_depth = depth
+            if value >= WIN_SCORE or value <= -WIN_SCORE:
+                break
+            # search the previous best first on the next iteration
+            moves.remove(move)
+            moves.insert(0, move)
+
+        self.last_search = {
+            "depth": completed_depth,
+            "nodes": self.nodes,
+            "seconds": time.monotonic() - started,
+            "tt": self.tt.stats()
+        }
+        return divmod(best_move, SIZE)
+
+    def quick_move(self, board: dict, color: str) -> tuple[int, int]:
+        """Best move by the ordering heuristic alone, used when a search cannot run in time"""
+        pos = Position(board, self.line_cache)
+        moves = self._ordered_moves(pos, COLOR_CHARS[color])
+        if not moves:
+            raise ValueError("No legal move left")
+        return divmod(moves[0], SIZE)
+
+
+# one engine per worker process, so its caches survive between moves
+_engine = None
+
+
+def choose_move(board: dict, color: str, time_budget: float) -> tuple[tuple[int, int], dict]:
+    """Process pool entry point, returns the move and the stats of its search"""
+    global _engine
+    if _engine is None:
+        _engine = GomokuAI(tt_bits=int(os.getenv("GOMOKU_TT_BITS", "18")))
+    move = _engine.choose_move(board, color, time_budget)
+    return move, _engine.last_search
@@ -0,0 +1,116 @@
+import mmap
+import os
+import struct
+from backend.game.providers.zobrist import BOARD_SIZE, ZOBRIST_KEYS
+
+N = BOARD_SIZE - 1
+
+# the 8 symmetries of the square board, as (x, y) -> (x, y) maps
+SYMMETRIES = [
+    lambda x, y: (x, y),
+    lambda x, y: (y, N - x),
+    lambda x, y: (N - x, N - y),
+    lambda x, y: (N - y, x),
+    lambda x, y: (x, N - y),
+    lambda x, y: (N - x, y),
+    lambda x, y: (y, x),
+    lambda x, y: (N - y, N - x),
+]
+# index of the symmetry that undoes each one
+INVERSE = [0, 3, 2, 1, 4, 5, 6, 7]
+
+# file layout: header, then `capacity` open-addressing slots of (key, move, weight)
+MAGIC = b"GMOB"
+HEADER = struct.Struct("<4sIII")  # magic, max_plies, capacity, entries
+SLOT = struct.Struct("<QHH")
+EMPTY_MOVE = 0xFFFF
+
+
+def canonical(board: dict) -> tuple[int, int]:
+    """Smallest zobrist hash of the board over all 8 symmetries, with the symmetry giving it"""
+    best_key, best_sym = None, 0
+    for sym, transform in enumerate(SYMMETRIES):
+        key = 0
+        for color, keys in ZOBRIST_KEYS.items():
+            for x, y in board.get(color, []):
+                tx, ty = transform(x, y)
+                key ^= keys[tx * BOARD_SIZE + ty]
+        if best_key is None or key < best_key:
+            best_key, best_sym = key, sym
+    return best_key, best_sym
+
+
+def game_sequence(board: dict) -> list[tuple[str, int, int]]:
+    """Move order of a stored board, black and white stones alternate starting with black"""
+    moves = []
+    for i in range(len(board["black"])):
+        moves.append(("black", *board["black"][i]))
+        if i < len(board["white"]):
+            moves.append(("white", *board["white"][i]))
+    return moves
+
+
+class OpeningBook:
+    """Read-only, memory-mapped opening book; lookups are a hash probe, O(1) on average"""
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.max_plies, self.capacity, self.entries = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an opening book")
+        self.mask = self.capacity - 1
+
+    @classmethod
+    def open_optional(cls, path: str = None) -> "OpeningBook | None":
+        """Open the book at path (default GOMOKU_OPENING_BOOK), or None when there is none"""
+        path = path or os.getenv("GOMOKU_OPENING_BOOK")
+        if not path or not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def _probe(self, key: int) -> int | None:
+        slot = key & self.mask
+        for _ in range(self.capacity):
+            stored_key, move, _ = SLOT.unpack_from(self._map, HEADER.size + slot * SLOT.size)
+            if move == EMPTY_MOVE:
+                return None
+            if stored_key == key:
+                return move
+            slot = (slot + 1) & self.mask
+        return None
+
+    def lookup(self, board: dict) -> tuple[int, int] | None:
+        """Book reply for the position, or None once out of book"""
+        plies = len(board.get("black", [])) + len(board.get("white", []))
+        if plies >= self.max_plies:
+            return None
+        key, sym = canonical(board)
+        move = self._probe(key)
+        if move is None:
+            return None
+        x, y = SYMMETRIES[INVERSE[sym]](*divmod(move, BOARD_SIZE))
+        occupied = {tuple(stone) for stones in board.values() for stone in stones}
+        return None if (x, y) in occupied else (x, y)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def write_opening_book(path: str, book: dict[int, tuple[int, int]], max_plies: int):
+    """Write {canonical key: (move, weight)} as an open-addressing table at most half full"""
+    capacity = 1
+    while capacity < 2 * max(len(book), 1):
+        capacity <<= 1
+    mask = capacity - 1
+    slots = [None] * capacity
+    for key, value in book.items():
+        slot = key & mask
+        while slots[slot] is not None:
+            slot = (slot + 1) & mask
+        slots[slot] = (key, *value)
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, max_plies, capacity, len(book)))
+        for entry in slots:
+            f.write(SLOT.pack(*entry) if entry else SLOT.pack(0, EMPTY_MOVE, 0))
@@ -0,0 +1,80 @@
+import random
+
+BOARD_SIZE = 19
+
+# fixed seed so hashes are stable across processes and restarts
+ZOBRIST_SEED = 0x6F6D6F6B
+_rng = random.Random(ZOBRIST_SEED)
+
+# color -> one 64-bit key per cell, indexed by x * BOARD_SIZE + y
+ZOBRIST_KEYS = {
+    color: [_rng.getrandbits(64) for _ in range(BOARD_SIZE * BOARD_SIZE)]
+    for color in ("black", "white")
+}
+
+
+def zobrist_key(color: str, x: int, y: int) -> int:
+    return ZOBRIST_KEYS[color][x * BOARD_SIZE + y]
+
+
+def zobrist_hash(board: dict) -> int:
+    """Hash of a stored {"black": [[x, y], ...], "white": [...]} board"""
+    h = 0
+    for color, keys in ZOBRIST_KEYS.items():
+        for x, y in board.get(color, []):
+            h ^= keys[x * BOARD_SIZE + y]
+    return h
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results indexed by zobrist hash.
+    A slot is only overwritten by a result searched at least as deep,
+    unless the stored one is left over from an earlier search.
+    """
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    def __init__(self, size_bits: int = 18):
+        self.size = 1 << size_bits
+        self.mask = self.size - 1
+        # per slot: (key, depth, value, flag, best_move, generation)
+        self.slots = [None] * self.size
+        self.generation = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.rejected = 0
+
+    def new_search(self):
+        self.generation += 1
+        self.reset_stats()
+
+    def get(self, key: int):
+        self.probes += 1
+        slot = self.slots[key & self.mask]
+        if slot is not None and slot[0] == key:
+            self.hits += 1
+            return slot
+        return None
+
+    def put(self, key: int, depth: int, value: int, flag: int, best_move: int):
+        idx = key & self.mask
+        slot = self.slots[idx]
+        if slot is not None and slot[5] == self.generation and slot[1] > depth:
+            self.rejected += 1
+            return
+        self.slots[idx] = (key, depth, value, flag, best_move, self.generation)
+        self.stores += 1
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "stores": self.stores,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,23 @@
+import os
+
+INITIAL_RATING = 1500.0
+# provisional players move faster until their rating has settled
+PROVISIONAL_GAMES = int(os.getenv("RATING_PROVISIONAL_GAMES", "30"))
+K_PROVISIONAL = float(os.getenv("RATING_K_PROVISIONAL", "40"))
+K_ESTABLISHED = float(os.getenv("RATING_K", "20"))
+
+
+def expected_score(rating: float, opponent: float) -> float:
+    return 1.0 / (1.0 + 10 ** ((opponent - rating) / 400))
+
+
+def k_factor(games_played: int) -> float:
+    return K_PROVISIONAL if games_played < PROVISIONAL_GAMES else K_ESTABLISHED
+
+
+def elo_deltas(rating_a: float, games_a: int, rating_b: float, games_b: int, score_a: float) -> tuple[float, float]:
+    """Rating changes of both players after one game, score_a being 1 for a win of A, 0.5 for a draw, 0 for a loss"""
+    expected_a = expected_score(rating_a, rating_b)
+    delta_a = k_factor(games_a) * (score_a - expected_a)
+    delta_b = k_factor(games_b) * ((1 - score_a) - (1 - expected_a))
+    return round(delta_a, 2), round(delta_b, 2)
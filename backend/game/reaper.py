@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import AsyncExitStack
+from datetime import datetime as dt, timezone as tz
+from backend.core.model.game import game_collection
+
+logger = logging.getLogger(__name__)
+
+# what the reaper reads of a candidate game: enough to tell whose turn it was
+REAPER_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "search_id": 1,
+    "data.ply": 1,
+    # games stored before moves were packed
+    "data.board": 1,
+    "data.p1_color": 1,
+    "data.p2_color": 1,
+}
+
+
+class GameReaper:
+    """
+    Periodic sweep ending the games nobody plays any more, in batches of
+    batch_size: lobbies nobody joined within lobby_ttl seconds expire, and
+    started games without a move for move_timeout seconds are forfeited by
+    the player to move. Both free their search ids, forfeits are settled.
+    Every worker runs a sweep; each game is ended by exactly one of them.
+    """
+    def __init__(self, service, lobby_ttl: float, move_timeout: float, interval: float, batch_size: int):
+        self.service = service
+        self.db = service.db
+        self.lobby_ttl = lobby_ttl
+        self.move_timeout = move_timeout
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task = None
+        self.sweeps = 0
+        self.expired = 0
+        self.forfeited = 0
+        self.last_sweep_seconds = 0.0
+
+    async def sweep(self) -> dict:
+        """One pass of both jobs, returning how many games each ended"""
+        started = time.perf_counter()
+        # the stored updated_at must include the moves still waiting in the write-behind cache
+        await self.service.cache.flush()
+        now = int(dt.now(tz.utc).timestamp())
+        expired = await self._reap(True, now - self.lobby_ttl, now, self._expire_batch)
+        forfeited = await self._reap(False, now - self.move_timeout, now, self._forfeit_batch)
+        self.sweeps += 1
+        self.expired += expired
+        self.forfeited += forfeited
+        self.last_sweep_seconds = time.perf_counter() - started
+        return {"expired": expired, "forfeited": forfeited}
+
+    async def _reap(self, can_join: bool, cutoff: int, now: int, end_batch) -> int:
+        ended = 0
+        while True:
+            games = await self.db.find_many(
+                game_collection,
+                {"is_active": True, "can_join": can_join, "updated_at": {"$lt": cutoff}},
+                REAPER_PROJECTION,
+                sort=[("updated_at", 1)],
+                limit=self.batch_size
+            )
+            if not games:
+                return ended
+            reaped = await end_batch(games, cutoff, now)
+            ended += reaped
+            # a short batch was the last one; an empty result means other workers are sweeping the same games
+            if len(games) < self.batch_size or not reaped:
+                return ended
+
+    async def _end(self, games: list[dict], cutoff: int, update: dict) -> list[dict]:
+        """
+        End the games still untouched since the cutoff with one update_many,
+        and return those this sweep ended: tagging them with a sweep id tells
+        them apart from games another worker ended or a late move kept alive.
+        """
+        cache = self.service.cache
+        async with AsyncExitStack() as locks:
+            # no flush of these games runs meanwhile, so their pending moves stay visible
+            for game in games:
+                await locks.enter_async_context(cache.lock(game["id"]))
+
+            idle, held = [], []
+            for game in games:
+                entry = cache.peek(game["id"])
+                # moves applied here but not stored yet keep the game alive
+                if game["id"] in cache.pending or (entry is not None and entry.game.updated_at >= cutoff):
+                    continue
+                if entry is not None and entry.game.is_active:
+                    # moves on the cached copy are refused until we know whether the game ended
+                    entry.game.is_active = False
+                    held.append(entry)
+                idle.append(game)
+
+            ended_ids = set()
+            try:
+                if idle:
+                    sweep_id = uuid.uuid4().hex
+                    ids = [game["id"] for game in idle]
+                    await self.db.update_many(
+                        game_collection,
+                        {"id": {"$in": ids}, "is_active": True, "updated_at": {"$lt": cutoff}},
+                        {**update, "is_active": False, "can_join": False, "data.sweep_id": sweep_id}
+                    )
+                    ended = await self.db.find_many(
+                        game_collection,
+                        {"id": {"$in": ids}, "data.sweep_id": sweep_id},
+                        {"_id": 0, "id": 1}
+                    )
+                    ended_ids = {game["id"] for game in ended}
+            finally:
+                for entry in held:
+                    if entry.game.id not in ended_ids:
+                        entry.game.is_active = True
+        return [game for game in idle if game["id"] in ended_ids]
+
+    async def _expire_batch(self, games: list[dict], cutoff: int, now: int) -> int:
+        ended = await self._end(games, cutoff, {"updated_at": now, "data.end_reason": "expired"})
+        for game in ended:
+            self.service.search_ids.release(game["search_id"])
+            await self._announce_end(game, {"type": "end", "reason": "expired", "winner": None, "updated_at": now})
+        return len(ended)
+
+    async def _forfeit_batch(self, games: list[dict], cutoff: int, now: int) -> int:
+        # the player to move forfeits, so games are ended in one update per winning color
+        by_winner = {}
+        for game in games:
+            by_winner.setdefault(self._waiting_color(game), []).append(game)
+
+        ended = []
+        for winner, batch in by_winner.items():
+            ended_batch = await self._end(batch, cutoff, {"updated_at": now, "data.winner": winner, "data.end_reason": "forfeit"})
+            for game in ended_batch:
+                await self._announce_end(game, {"type": "end", "reason": "forfeit", "winner": winner, "updated_at": now})
+            ended.extend(ended_batch)
+
+        # settling also frees their search ids
+        settled = await asyncio.gather(
+            *(self.service.settle_gomoku_game(game["id"]) for game in ended),
+            return_exceptions=True
+        )
+        for game, result in zip(ended, settled):
+            if isinstance(result, Exception):
+                logger.error("Settlement of forfeited game %s failed: %s", game["id"], result)
+        return len(ended)
+
+    @staticmethod
+    def _waiting_color(game: dict) -> str:
+        """The color of the player not to move, who wins the forfeit"""
+        data = game["data"]
+        if "board" in data:
+            # the turn rule of apply_gomoku_move, which also covers boards whose counts do not alternate
+            to_move = "black" if len(data["board"]["black"]) == len(data["board"]["white"]) else "white"
+        else:
+            # black moves on even plies
+            to_move = "black" if data["ply"] % 2 == 0 else "white"
+        return "white" if to_move == "black" else "black"
+
+    async def _announce_end(self, game: dict, event: dict):
+        """Drop the game from the cache here and, through the broadcast, on every other worker"""
+        service = self.service
+        service.cache.games.pop(game["id"])
+        service.cache.pending.pop(game["id"], None)
+        await service.broadcast(game["id"], event)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                result = await self.sweep()
+                if result["expired"] or result["forfeited"]:
+                    logger.info("Reaped %s expired lobbies and %s stale games", result["expired"], result["forfeited"])
+            except Exception:
+                logger.exception("Game reaper sweep failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "sweeps": self.sweeps,
+            "expired": self.expired,
+            "forfeited": self.forfeited,
+            "last_sweep_seconds": self.last_sweep_seconds,
+            "lobby_ttl": self.lobby_ttl,
+            "move_timeout": self.move_timeout
+        }
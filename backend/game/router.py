@@ -1,97 +1,205 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Annotated
-from backend.core.model.game import CreateGameRequest, JoinGameRequest, GomokuMoveRequest
+from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from typing import Annotated, Optional
+from backend.core.model.game import CreateGameRequest, JoinGameRequest, GomokuMoveRequest, GameType, MatchRequest, Game
+from backend.core.model.response import Envelope, GamePage
+from backend.core.response import FastJSONResponse, envelope, ndjson_stream
 from backend.core.model.user import User
 from backend.game.service import GameService
-from backend.auth.service import get_current_active_user
+from backend.auth.service import get_current_active_user, resolve_user
 
 router = APIRouter(
     prefix="/game",
-    tags=["game"]
+    tags=["game"],
+    default_response_class=FastJSONResponse
 )
 
 game_service = GameService()
 
 # Public endpoint - no JWT token required
-@router.get("/list")
-async def get_game_list() -> dict:
+@router.get("/list", response_model=Envelope[GamePage])
+async def get_game_list(
+    can_join: Optional[bool] = True,
+    type: Optional[GameType] = None,
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    stream: bool = False
+) -> FastJSONResponse | StreamingResponse:
     """
     Get game list - public endpoint, no authentication required
-    Anyone can view available games
+    Anyone can view available games, a page at a time via next_cursor
+    stream=true returns every matching game as newline-delimited JSON instead
     """
+    if stream:
+        games = game_service.stream_games(can_join, type)
+        return StreamingResponse(ndjson_stream(games, "game list"), media_type="application/x-ndjson")
+
     try:
-        games = await game_service.get_available_games()
-        return {
-            "status": 1,
-            "data": games,
-            "message": "Successfully retrieved game list"
-        }
+        page = await game_service.get_available_games(can_join, type, cursor, limit)
+        return envelope(page, "Successfully retrieved game list")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/cache/stats", response_model=Envelope[dict])
+async def get_game_cache_stats() -> FastJSONResponse:
+    """
+    Hot-game cache metrics - hit/miss counts and write-behind flush lag
+    """
+    return envelope(game_service.cache_stats(), "Successfully retrieved game cache stats")
+
+@router.get("/reaper/stats", response_model=Envelope[dict])
+async def get_game_reaper_stats() -> FastJSONResponse:
+    """
+    Game reaper metrics - expired lobbies and forfeited games so far
+    """
+    return envelope(game_service.reaper_stats(), "Successfully retrieved game reaper stats")
+
+@router.get("/ai/stats", response_model=Envelope[dict])
+async def get_game_ai_stats() -> FastJSONResponse:
+    """
+    Stats of the last bot search - depth reached and transposition table hit rate
+    """
+    return envelope(game_service.ai_stats(), "Successfully retrieved game AI stats")
+
 # Protected endpoint - JWT token required
-@router.post("/create")
+@router.post("/create", response_model=Envelope[Game])
 async def create_game(
     request: CreateGameRequest,
     current_user: Annotated[User, Depends(get_current_active_user)]
-) -> dict:
+) -> FastJSONResponse:
     """
     Create game - requires JWT authentication
     Only authenticated active users can create games
     """
     try:
         game = await game_service.create_game(current_user.id, request)
-        return {
-            "status": 1,
-            "data": game.model_dump(),
-            "message": f"Game created successfully by {current_user.name}"
-        }
+        return envelope(game, f"Game created successfully by {current_user.name}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/join")
+@router.post("/join", response_model=Envelope[Game])
 async def join_game(
     request: JoinGameRequest,
     current_user: Annotated[User, Depends(get_current_active_user)]
-) -> dict:
+) -> FastJSONResponse:
     try:
         game = await game_service.join_game(current_user.id, request)
-        return {
-            "status": 1,
-            "data": game.model_dump(),
-            "message": f"Game joined successfully by {current_user.name}"
-        }
+        return envelope(game, f"Game joined successfully by {current_user.name}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
-@router.post("/gomoku/{game_id}/move")
+@router.post("/match", response_model=Envelope[Game])
+async def find_match(
+    request: MatchRequest,
+    current_user: Annotated[User, Depends(get_current_active_user)]
+) -> FastJSONResponse:
+    """
+    Wait for an opponent of the same game type and rating band
+    Returns the game created for both players once paired
+    """
+    try:
+        game = await game_service.find_match(current_user, request)
+        return envelope(game, f"Match found for {current_user.name}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/match/stats", response_model=Envelope[dict])
+async def get_match_stats() -> FastJSONResponse:
+    """
+    Matchmaking metrics - players waiting and wait-time percentiles
+    """
+    return envelope(game_service.matchmaking.stats(), "Successfully retrieved matchmaking stats")
+
+@router.post("/gomoku/{game_id}/move", response_model=Envelope[Game])
 async def gomoku_move(
     game_id: str,
     request: GomokuMoveRequest,
     current_user: Annotated[User, Depends(get_current_active_user)]
-) -> dict:
+) -> FastJSONResponse:
     try:
         game = await game_service.gomoku_move(current_user.id, game_id, request)
-        return {
-            "status": 1,
-            "data": game.model_dump(),
-            "message": f"Gomoku move made successfully by {current_user.name}"
-        }
+        return envelope(game, f"Gomoku move made successfully by {current_user.name}")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # the engine rejects moves off the board or onto an occupied cell
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
-@router.get("/gomoku/{game_id}/status")
+@router.get("/gomoku/{game_id}/status", response_model=Envelope[Game])
 async def get_gomoku_status(
     game_id: str,
-    current_user: Annotated[User, Depends(get_current_active_user)]
-) -> dict:
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    compact: bool = False
+) -> FastJSONResponse:
+    """
+    compact=true replaces data.board with data.moves: the packed move
+    sequence as base64, which Gomoku.load_board and unpack_board accept as is.
+    Boards whose stone counts do not alternate are always returned as data.board
+    """
     try:
         game = await game_service.get_gomoku_status(current_user.id, game_id)
-        return {
-            "status": 1,
-            "data": game.model_dump(),
-            "message": f"Gomoku board retrieved successfully by {current_user.name}"
-        }
+        data = game.model_dump()
+        if compact and game_service.gomoku.can_pack_board(data["data"]["board"]):
+            data["data"]["moves"] = game_service.gomoku.compact_board(data["data"].pop("board"))
+        return envelope(data, f"Gomoku board retrieved successfully by {current_user.name}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/gomoku/{game_id}/replay", response_model=None)
+async def replay_gomoku_game(
+    game_id: str,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    from_ply: Annotated[int, Query(ge=0)] = 0
+) -> StreamingResponse:
+    """
+    Every position of the game from from_ply on, one JSON line per move:
+    {"ply", "x", "y", "color", "board"} with board the position after the move
+    """
+    try:
+        await game_service.get_gomoku_status(current_user.id, game_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    positions = game_service.replay_game(game_id, from_ply)
+    return StreamingResponse(ndjson_stream(positions, f"replay of game {game_id}"), media_type="application/x-ndjson")
+
+
+@router.websocket("/gomoku/{game_id}/ws")
+async def gomoku_updates(websocket: WebSocket, game_id: str, token: str):
+    """
+    Live updates for a game - JWT passed as the token query parameter
+    Players and spectators get the current game once, then only move deltas
+    """
+    try:
+        current_user = await resolve_user(token)
+        if not current_user.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        game = await game_service.get_game(game_id)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await game_service.hub.connect(game_id, websocket)
+    try:
+        await websocket.send_json({"type": "state", "data": game.model_dump()})
+        while True:
+            # clients only listen, reading keeps the disconnect detectable
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        game_service.hub.disconnect(game_id, websocket)
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from collections import deque
+from backend.core.database import MongoAsyncClient
+
+logger = logging.getLogger(__name__)
+
+counter_collection = "counters"
+
+SEARCH_ID_MIN = 100000
+SEARCH_ID_SPACE = 900000
+# coprime with SEARCH_ID_SPACE, so n -> n * STRIDE + OFFSET is a shuffle of the id space
+SEARCH_ID_STRIDE = 387433
+SEARCH_ID_OFFSET = 52711
+
+
+class SearchIdAllocator:
+    """
+    Hands out 6-digit search ids without probing Mongo.
+    Each worker reserves a block of sequence numbers with one atomic $inc on
+    a shared counter and maps them through a fixed shuffle of the id space;
+    the next block is fetched in the background before the current one runs
+    out. Ids released by ended games are handed out again first.
+    """
+    def __init__(self, db: MongoAsyncClient, block_size: int = 1000, low_water: int = 100):
+        self.db = db
+        self.block_size = block_size
+        self.low_water = low_water
+        self.free = deque()
+        self._next = 0
+        self._end = 0
+        self._spare = None
+        self._lock = asyncio.Lock()
+        self._prefetch = None
+
+    @staticmethod
+    def search_id_of(sequence: int) -> str:
+        return str(SEARCH_ID_MIN + (sequence * SEARCH_ID_STRIDE + SEARCH_ID_OFFSET) % SEARCH_ID_SPACE)
+
+    async def _reserve(self) -> tuple[int, int]:
+        counter = await self.db.find_one_and_update(
+            counter_collection,
+            {"_id": "search_id"},
+            {"$inc": {"next": self.block_size}},
+            upsert=True
+        )
+        end = counter["next"]
+        return end - self.block_size, end
+
+    async def _prefetch_block(self):
+        try:
+            async with self._lock:
+                if self._spare is None:
+                    self._spare = await self._reserve()
+        except Exception:
+            logger.exception("Could not reserve the next search id block")
+
+    async def allocate(self) -> str:
+        if self.free:
+            return self.free.popleft()
+
+        while self._next >= self._end:
+            async with self._lock:
+                if self._next >= self._end:
+                    if self._spare is None:
+                        self._spare = await self._reserve()
+                    (self._next, self._end), self._spare = self._spare, None
+
+        sequence = self._next
+        self._next += 1
+        if self._end - self._next <= self.low_water and self._spare is None \
+                and (self._prefetch is None or self._prefetch.done()):
+            self._prefetch = asyncio.create_task(self._prefetch_block())
+        return self.search_id_of(sequence)
+
+    def release(self, search_id: str):
+        """Make the search id of an ended game available again"""
+        self.free.append(search_id)
@@ -1,34 +1,187 @@
 from backend.core.database import MongoAsyncClient
-from backend.core.model.game import game_collection, CreateGameRequest, Game, JoinGameRequest, GameType, GomokuMoveRequest
+from backend.core.pubsub import PubSub, pubsub as default_pubsub
+from backend.core.model.user import user_collection, User
+from backend.core.model.game import game_collection, CreateGameRequest, Game, JoinGameRequest, GameType, GomokuMoveRequest, MatchRequest, GOMOKU_BOT_ID, GAME_LIST_PROJECTION
+import asyncio
+import logging
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime as dt, timezone as tz
 from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+from backend.auth.service import invalidate_user
+from backend.game.cache import GameCache, CachedGame
+from backend.game.hub import GameHub
+from backend.game.matchmaking import MatchmakingQueue
+from backend.game.move_log import MoveLog, MoveLogGap
+from backend.game.reaper import GameReaper
+from backend.game.rating import INITIAL_RATING, elo_deltas
+from backend.game.search_id import SearchIdAllocator
 from backend.game.providers.gomoku import Gomoku
+from backend.game.providers.gomoku_ai import GomokuAI, choose_move
+from backend.game.providers.opening_book import OpeningBook, game_sequence
+
+logger = logging.getLogger(__name__)
+
+# extra time granted to the AI worker before falling back to a heuristic move
+AI_GRACE_SECONDS = 0.25
+
+# pub/sub channel of game events: {"game_id", "event"} with event the websocket delta
+GAME_UPDATES_CHANNEL = "game.updates"
 
 
 class GameService:
-    def __init__(self):
+    def __init__(self, pubsub: PubSub = None):
         self.db = MongoAsyncClient()
-        self.gomoku = Gomoku()
+        # fan-out of game updates to the other workers of the deployment
+        self.pubsub = pubsub or default_pubsub
+        # with several workers every move is stored before it is acknowledged and broadcast
+        self.write_through = os.getenv("GAME_WRITE_THROUGH", "1" if self.pubsub.shared else "0") == "1"
+        self.gomoku = Gomoku(OpeningBook.open_optional())
+        self.move_log = MoveLog(self.db)
+        self.cache = GameCache(
+            self.db,
+            self.move_log,
+            maxsize=int(os.getenv("GAME_CACHE_SIZE", "1000")),
+            ttl=float(os.getenv("GAME_CACHE_TTL_SECONDS", "600")),
+            flush_interval=float(os.getenv("GAME_FLUSH_INTERVAL_MS", "200")) / 1000,
+            # settled only once the win is stored, whichever flush stores it
+            on_decided=lambda game_id: self._spawn(self.settle_gomoku_game(game_id)),
+            on_conflict=lambda game_id, events: self._spawn(self.broadcast(game_id, {
+                # clients re-read the game: these moves were acknowledged but are not stored
+                "type": "conflict",
+                "dropped_plies": [event["ply"] for event in events]
+            }))
+        )
+        self.hub = GameHub()
+        self.search_ids = SearchIdAllocator(self.db)
+        self.matchmaking = MatchmakingQueue(
+            self.db,
+            self.create_match_game,
+            self.get_game,
+            shared=os.getenv("MATCHMAKING_SHARED", "1") == "1",
+            pubsub=self.pubsub
+        )
+        self.match_band_width = float(os.getenv("MATCH_RATING_BAND_WIDTH", "200"))
+        self.reaper = GameReaper(
+            self,
+            lobby_ttl=float(os.getenv("GAME_LOBBY_TTL_SECONDS", "1800")),
+            move_timeout=float(os.getenv("GAME_MOVE_TIMEOUT_SECONDS", "600")),
+            interval=float(os.getenv("GAME_REAPER_INTERVAL_SECONDS", "30")),
+            batch_size=int(os.getenv("GAME_REAPER_BATCH_SIZE", "500"))
+        )
+        self._last_game_ms = 0
+        # searches run in worker processes so they never hold the event loop
+        self.ai_pool = ProcessPoolExecutor(max_workers=int(os.getenv("GOMOKU_AI_WORKERS", "2")))
+        self.ai_time_budget = float(os.getenv("GOMOKU_AI_TIME_MS", "1000")) / 1000
+        self.ai = GomokuAI()
+        self.last_ai_search = {}
+        # bot moves and settlements running after the request that triggered them
+        self._tasks = set()
+
+    def start(self):
+        """Start the write-behind flusher, matchmaking poller and game reaper, called from the app lifespan"""
+        self.pubsub.subscribe(GAME_UPDATES_CHANNEL, self.on_remote_update)
+        self.cache.start()
+        self.matchmaking.start()
+        self.reaper.start()
+
+    async def stop(self):
+        """Stop the flusher and write every pending move"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.ai_pool.shutdown(wait=False, cancel_futures=True)
+        await self.reaper.stop()
+        await self.matchmaking.stop()
+        await self.cache.stop()
 
     def create_game_id(self) -> str:
-        return hex(int(dt.now(tz.utc).timestamp() * 1000))[2:]
+        # millisecond timestamp, bumped so games created in the same millisecond still differ
+        game_ms = max(int(dt.now(tz.utc).timestamp() * 1000), self._last_game_ms + 1)
+        self._last_game_ms = game_ms
+        return hex(game_ms)[2:]
     
     async def create_search_id(self) -> str:
-        MAX_ATTEMPTS = 10
-        for _ in range(MAX_ATTEMPTS):
-            search_id = str(random.randint(100000, 999999))
-            if not await self.db.find_one(game_collection, {"search_id": search_id}):
-                return search_id
-        raise HTTPException(status_code=500, detail="Unable to generate unique search_id after multiple attempts")
+        return await self.search_ids.allocate()
 
-    async def get_game(self, game_id: str) -> Game:
+    def game_document(self, game: Game) -> dict:
+        """
+        The stored form of a game: gomoku boards are kept as packed move
+        bytes, except boards whose stone counts do not alternate
+        """
+        document = game.model_dump()
+        board = document["data"].get("board")
+        if board is not None:
+            document["data"]["ply"] = len(board["black"]) + len(board["white"])
+            if self.gomoku.can_pack_board(board):
+                document["data"]["moves"] = self.gomoku.pack_board(document["data"].pop("board"))
+        return document
+
+    def game_from_document(self, document: dict) -> Game:
+        data = document.get("data", {})
+        if "moves" in data:
+            data["board"] = self.gomoku.unpack_board(data.pop("moves"))
+        data.pop("ply", None)
+        return Game(**document)
+
+    async def load_game(self, game_id: str) -> Game:
         game = await self.db.find_one(game_collection, {"id": game_id})
         if not game:
             raise HTTPException(status_code=404, detail=f"Game with id {game_id} not found")
-        return Game(**game)
+        return self.game_from_document(game)
+
+    async def get_cached_game(self, game_id: str) -> CachedGame:
+        return await self.cache.get(game_id, self.load_game)
+
+    async def get_game(self, game_id: str) -> Game:
+        return (await self.get_cached_game(game_id)).game
     
-    async def create_game(self, user_id: str, request: CreateGameRequest) -> Game:
+    def game_list_filter(self, can_join: bool | None, game_type: GameType | None, cursor: str | None = None) -> dict:
+        filter = {}
+        if can_join is not None:
+            filter["can_join"] = can_join
+        if game_type is not None:
+            filter["type"] = game_type.value
+        if cursor:
+            # ids are hex creation timestamps, newest first
+            filter["id"] = {"$lt": cursor}
+        return filter
+
+    async def get_available_games(
+        self,
+        can_join: bool | None = True,
+        game_type: GameType | None = None,
+        cursor: str | None = None,
+        limit: int = 20
+    ) -> dict:
+        """One page of games without their boards, plus the cursor of the next page"""
+        games = await self.db.find_many(
+            game_collection,
+            self.game_list_filter(can_join, game_type, cursor),
+            GAME_LIST_PROJECTION,
+            sort=[("id", -1)],
+            limit=limit
+        )
+        return {
+            "games": games,
+            "next_cursor": games[-1]["id"] if len(games) == limit else None
+        }
+
+    async def stream_games(self, can_join: bool | None = True, game_type: GameType | None = None, batch_size: int = 500):
+        """Every matching game without its board, read batch by batch"""
+        async for games in self.db.iter_batches(
+            game_collection,
+            self.game_list_filter(can_join, game_type),
+            GAME_LIST_PROJECTION,
+            batch_size=batch_size,
+            sort=[("id", -1)]
+        ):
+            for game in games:
+                yield game
+
+    async def create_game(self, user_id: str, request: CreateGameRequest, opponent_id: str = None) -> Game:
         game = Game(
             id=self.create_game_id(),
             search_id=await self.create_search_id(),
@@ -49,15 +202,44 @@ class GameService:
                 "board": self.gomoku.create_board(),
                 "winner": None
             }
+            if request.vs_bot:
+                game.data["p2_id"] = GOMOKU_BOT_ID
+                game.data["vs_bot"] = True
+                game.can_join = False
+            elif opponent_id:
+                game.data["p2_id"] = opponent_id
+                game.can_join = False
 
-        await self.db.insert_one(game_collection, game.model_dump())
+        # another worker may hold the same id, or a live game a recycled search id: take the next one
+        MAX_ATTEMPTS = 5
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                await self.db.insert_one(game_collection, self.game_document(game))
+                break
+            except DuplicateKeyError as e:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                if "search_id" in str(e):
+                    game.search_id = await self.create_search_id()
+                else:
+                    game.id = self.create_game_id()
+        self.cache.put(game)
         return game
     
+    async def create_match_game(self, p1_id: str, p2_id: str, game_type: GameType) -> Game:
+        """Game for two matched players, inserted with both seats already taken"""
+        return await self.create_game(p1_id, CreateGameRequest(type=game_type), opponent_id=p2_id)
+
+    async def find_match(self, user: User, request: MatchRequest) -> Game:
+        # players are paired within bands of their stored rating, never one they pick
+        band = int(user.rating // self.match_band_width)
+        return await self.matchmaking.find_match(user.id, request.type, band)
+
     async def join_game(self, user_id: str, request: JoinGameRequest) -> Game:
-        game = await self.db.find_one(game_collection, {"search_id": request.search_id})
+        game = await self.db.find_one(game_collection, {"search_id": request.search_id, "is_active": True})
         if not game:
             raise HTTPException(status_code=404, detail=f"Game with search_id {request.search_id} not found")
-        game = Game(**game)
+        game = self.game_from_document(game)
         
         if not game.is_active or not game.can_join:
             raise HTTPException(status_code=400, detail="Game is not active or can't join")
@@ -65,26 +247,140 @@ class GameService:
         if game.type == GameType.GOMOKU.value:
             game.data["p2_id"] = user_id
             game.can_join = False
-            await self.db.update_one(game_collection, {"id": game.id}, game.model_dump())
+            game.updated_at = int(dt.now(tz.utc).timestamp())
+            joined = await self.db.update_one(
+                game_collection,
+                {"id": game.id, "can_join": True},
+                {"data.p2_id": user_id, "can_join": False, "updated_at": game.updated_at}
+            )
+            if not joined:
+                raise HTTPException(status_code=400, detail="Game is not active or can't join")
+
+            # the creator may already be polling a cached copy
+            entry = self.cache.peek(game.id)
+            if entry is not None:
+                self._apply_join(entry.game, user_id, game.updated_at)
+                game = entry.game
+
+            await self.broadcast(game.id, {"type": "join", "p2_id": user_id, "updated_at": game.updated_at})
 
-        game.updated_at = int(dt.now(tz.utc).timestamp())
         return game
     
     async def gomoku_move(self, user_id: str, game_id: str, request: GomokuMoveRequest) -> Game:
-        game = await self.get_game(game_id)
+        entry = await self.get_cached_game(game_id)
+        game = entry.game
+
+        if user_id != game.data["p1_id"] and user_id != game.data["p2_id"]:
+            raise HTTPException(status_code=403, detail="You are not allowed to access this game")
+
         color = game.data['p1_color'] if user_id == game.data['p1_id'] else game.data['p2_color']
-        board, is_win = self.gomoku.move(
-            game.data["board"],
-            color,
-            request.x,
-            request.y
-        )
-        game.data["board"] = board
+        game = await self.apply_gomoku_move(entry, color, request.x, request.y)
+
+        if game.data.get("vs_bot") and not game.data["winner"]:
+            self._spawn(self.gomoku_bot_move(game.id))
+        return game
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def apply_gomoku_move(self, entry: CachedGame, color: str, x: int, y: int) -> Game:
+        game = entry.game
+        if game.data["winner"] or not game.is_active:
+            raise HTTPException(status_code=400, detail="Game is already over")
+        board = game.data["board"]
+        turn = "black" if len(board["black"]) == len(board["white"]) else "white"
+        if color != turn:
+            raise HTTPException(status_code=400, detail="Not your turn")
+
+        # applied in memory first, with no await in between, so moves on one game never interleave
+        _, is_win = self.gomoku.move(entry.board, color, x, y)
+        board[color].append([x, y])
         if is_win:
             game.data['winner'] = color
+            game.is_active = False
         game.updated_at = int(dt.now(tz.utc).timestamp())
-        await self.db.update_one(game_collection, {"id": game.id}, game.model_dump())
+        self.cache.record_move(entry, color, x, y)
+
+        if is_win or self.write_through:
+            if await self.cache.flush_game(game.id) is False:
+                raise HTTPException(status_code=409, detail="Game was changed by another request, please retry")
+        await self.broadcast(game.id, {
+            "type": "move",
+            "x": x,
+            "y": y,
+            "color": color,
+            "winner": game.data["winner"],
+            "ply": len(board["black"]) + len(board["white"]),
+            "updated_at": game.updated_at
+        })
         return game
+
+    def _apply_join(self, game: Game, user_id: str, updated_at: int):
+        game.data["p2_id"] = user_id
+        game.can_join = False
+        game.updated_at = updated_at
+
+    async def broadcast(self, game_id: str, event: dict):
+        """Push a game event to the websockets of this worker and, through pub/sub, of every other one"""
+        await self.hub.publish(game_id, event)
+        await self.pubsub.publish(GAME_UPDATES_CHANNEL, {"game_id": game_id, "event": event})
+
+    async def on_remote_update(self, message: dict):
+        """
+        Apply an event of another worker to the cached copy of its game, or
+        drop the copy when it is not exactly one move behind, then forward
+        the event to the websockets connected here.
+        """
+        game_id, event = message["game_id"], message["event"]
+        entry = self.cache.peek(game_id)
+        if entry is not None:
+            game = entry.game
+            if event["type"] == "join":
+                self._apply_join(game, event["p2_id"], event["updated_at"])
+            elif event["type"] == "move":
+                board = game.data["board"]
+                if game_id in self.cache.pending or len(board["black"]) + len(board["white"]) != event["ply"] - 1:
+                    self.cache.games.pop(game_id)
+                else:
+                    entry.board.place(event["color"], event["x"], event["y"])
+                    board[event["color"]].append([event["x"], event["y"]])
+                    game.data["winner"] = event["winner"]
+                    game.is_active = event["winner"] is None
+                    game.updated_at = event["updated_at"]
+            elif event["type"] == "end":
+                # ended by a reaper: re-read from Mongo on next use
+                self.cache.games.pop(game_id)
+                self.cache.pending.pop(game_id, None)
+        await self.hub.publish(game_id, event)
+
+    async def gomoku_bot_move(self, game_id: str):
+        """Answer the human move of a vs-bot game, within the AI latency budget"""
+        try:
+            game = await self.get_game(game_id)
+            color = game.data["p2_color"]
+            board = {c: list(stones) for c, stones in game.data["board"].items()}
+            loop = asyncio.get_running_loop()
+            book_move = self.gomoku.book_move(board)
+            if book_move is not None:
+                x, y = book_move
+            else:
+                try:
+                    (x, y), self.last_ai_search = await asyncio.wait_for(
+                        loop.run_in_executor(self.ai_pool, choose_move, board, color, self.ai_time_budget),
+                        timeout=self.ai_time_budget + AI_GRACE_SECONDS
+                    )
+                    logger.info("Bot search for game %s: %s", game_id, self.last_ai_search)
+                except asyncio.TimeoutError:
+                    # off the event loop, but in a thread: the timed-out search may still hold a pool worker
+                    x, y = await asyncio.to_thread(self.ai.quick_move, board, color)
+
+            # the cached entry may have been replaced while the search ran
+            entry = await self.get_cached_game(game_id)
+            await self.apply_gomoku_move(entry, color, x, y)
+        except Exception:
+            logger.exception("Bot move failed for game %s", game_id)
     
     async def get_gomoku_status(self, user_id: str, game_id: str) -> dict:
         game = await self.get_game(game_id)
@@ -102,6 +398,126 @@ class GameService:
         
         win_color = self.gomoku.check_win(game.data["board"])
         return win_color
+
+    async def replay_game(self, game_id: str, from_ply: int = 0):
+        """
+        Stream every position of a game from from_ply on, as
+        {"ply", "x", "y", "color", "board"} with board the position after the move
+        """
+        game = await self.get_game(game_id)
+        if game_id in self.cache.pending:
+            await self.cache.flush_game(game_id)
+
+        stored_plies = len(game.data["board"]["black"]) + len(game.data["board"]["white"])
+        replayed = 0
+        try:
+            async for ply, event, board in self.move_log.replay(game_id, from_ply):
+                replayed = ply
+                yield {"ply": ply, "x": event["x"], "y": event["y"], "color": event["color"], "board": board}
+            if replayed >= stored_plies:
+                return
+            if replayed:
+                raise MoveLogGap(f"Game {game_id} has no move logged past ply {replayed} of {stored_plies}")
+        except MoveLogGap as e:
+            logger.error("Replay of game %s falls back to the stored board: %s", game_id, e)
+
+        # games played before the move log existed, or whose log has a gap: rebuild the order from the stored stones
+        board = {"black": [], "white": []}
+        for ply, (color, x, y) in enumerate(game_sequence(game.data["board"]), start=1):
+            board[color].append([x, y])
+            if ply >= from_ply and ply > replayed:
+                yield {"ply": ply, "x": x, "y": y, "color": color, "board": {c: list(s) for c, s in board.items()}}
+
+    async def audit_gomoku_games(self, batch_size: int = 1000) -> list[dict]:
+        """
+        Re-validate every stored gomoku board against its recorded winner.
+        Returns the games whose stored winner disagrees with the board, and
+        the games whose board cannot be loaded, with the error as board_error.
+        """
+        mismatches = []
+        async for games in self.db.iter_batches(
+            game_collection,
+            {"type": GameType.GOMOKU.value},
+            {"_id": 0, "id": 1, "data.board": 1, "data.moves": 1, "data.winner": 1},
+            batch_size=batch_size
+        ):
+            # packed move bytes are loaded straight into bitboards
+            loaded, bitboards = [], []
+            for game in games:
+                try:
+                    bitboards.append(self.gomoku.load_board(game["data"].get("moves", game["data"].get("board"))))
+                    loaded.append(game)
+                except (ValueError, TypeError, KeyError) as e:
+                    # stones off the board or on an occupied cell: exactly what the audit is for
+                    mismatches.append({
+                        "id": game["id"],
+                        "stored_winner": game["data"].get("winner"),
+                        "board_winner": None,
+                        "board_error": str(e)
+                    })
+            winners = self.gomoku.check_win_many(bitboards)
+            for game, winner in zip(loaded, winners):
+                if winner != game["data"].get("winner"):
+                    mismatches.append({
+                        "id": game["id"],
+                        "stored_winner": game["data"].get("winner"),
+                        "board_winner": winner
+                    })
+        return mismatches
     
-    async def settle_gomoku_game(self,):
-        pass
\ No newline at end of file
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+    def reaper_stats(self) -> dict:
+        return self.reaper.stats()
+
+    def ai_stats(self) -> dict:
+        """Depth, node count and transposition table hit rate of the last bot search"""
+        return self.last_ai_search
+
+    async def settle_gomoku_game(self, game_id: str) -> dict | None:
+        """
+        Free the search id of a decided game and update the ratings of both
+        players, at most once: the game is claimed by flagging it settled first.
+        Returns the rating changes by user id, None when there was nothing to settle.
+        """
+        game = await self.db.find_one_and_update(
+            game_collection,
+            {"id": game_id, "data.winner": {"$ne": None}, "data.settled": {"$ne": True}},
+            {"$set": {"data.settled": True}}
+        )
+        if not game:
+            return None
+        self.search_ids.release(game["search_id"])
+        data = game["data"]
+        # games against the bot are not rated
+        if data.get("vs_bot") or data["p2_id"] in (None, GOMOKU_BOT_ID):
+            return None
+
+        players = {
+            user["id"]: User(**user)
+            for user in await self.db.find_many(user_collection, {"id": {"$in": [data["p1_id"], data["p2_id"]]}})
+        }
+        p1, p2 = players.get(data["p1_id"]), players.get(data["p2_id"])
+        if p1 is None or p2 is None:
+            logger.warning("Game %s not rated: a player no longer exists", game_id)
+            return None
+
+        p1_won = data["winner"] == data["p1_color"]
+        delta_1, delta_2 = elo_deltas(p1.rating, p1.games_played, p2.rating, p2.games_played, 1.0 if p1_won else 0.0)
+        changes = {p1.id: delta_1, p2.id: delta_2}
+        for user_id, delta, won in ((p1.id, delta_1, p1_won), (p2.id, delta_2, not p1_won)):
+            # users created before ratings existed start from the initial rating
+            await self.db.modify_one(
+                user_collection,
+                {"id": user_id, "rating": {"$exists": False}},
+                {"$set": {"rating": INITIAL_RATING, "games_played": 0, "wins": 0}}
+            )
+            # relative updates, so concurrent settlements of one player never lose each other
+            await self.db.modify_one(
+                user_collection,
+                {"id": user_id},
+                {"$inc": {"rating": delta, "games_played": 1, "wins": int(won)}}
+            )
+            await invalidate_user(user_id)
+        return changes
\ No newline at end of file
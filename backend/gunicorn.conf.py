@@ -0,0 +1,29 @@
+# Multi-worker deployment: gunicorn -c backend/gunicorn.conf.py backend.main:app
+#
+# Every worker is a separate process with its own game cache, websockets and
+# matchmaking queue. They stay consistent through the mongo pub/sub backend
+# (change streams, so MONGO_URL must point at a replica set), and moves are
+# written through to Mongo before they are acknowledged.
+import multiprocessing
+import os
+
+os.environ.setdefault("PUBSUB_BACKEND", "mongo")
+os.environ.setdefault("GAME_WRITE_THROUGH", "1")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# each worker opens its own Mongo pool and AI process pool after the fork
+preload_app = False
+
+# websockets and matchmaking waits hold requests open for up to 30s
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+# recycle workers now and then, spread out so they do not restart together
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+accesslog = os.getenv("ACCESS_LOG", "-")
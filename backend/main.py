@@ -1,16 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from backend.auth.router import router as auth_router
 from backend.user.router import router as user_router
-from backend.game.router import router as game_router
+from backend.game.router import router as game_router, game_service
+from backend.core.database import open_mongo_clients, close_mongo_clients
+from backend.core.indexes import ensure_indexes
+from backend.core.metrics import metrics, TimingMiddleware
+from backend.core.pubsub import pubsub
 from scalar_fastapi import get_scalar_api_reference
 
 import uvicorn 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    open_mongo_clients()
+    await ensure_indexes()
+    pubsub.start()
+    game_service.start()
+    yield
+    await game_service.stop()
+    await pubsub.stop()
+    # the only place the shared Mongo clients are closed
+    await close_mongo_clients()
+
 app = FastAPI(
     title="Gomoku Game API",
     description="A complete Gomoku game backend API with user authentication and game management",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -22,6 +41,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# outermost, so the recorded latency covers every other middleware too
+app.add_middleware(TimingMiddleware)
+
 # Register routers
 app.include_router(auth_router)
 app.include_router(user_router)
@@ -31,6 +53,26 @@ app.include_router(game_router)
 async def root():
     return {"message": "Hello World"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus text format - request latency per route, Mongo latency,
+    documents and bytes per collection and operation
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/slow")
+async def get_slow_traces():
+    """
+    Span traces of the latest slow requests, kept for the share of requests
+    sampled by METRICS_TRACE_SAMPLE_RATE
+    """
+    return {
+        "status": 1,
+        "data": list(metrics.slow_traces),
+        "message": "Successfully retrieved slow request traces"
+    }
+
 @app.get("/scalar")
 async def scalar():
     return get_scalar_api_reference(
@@ -0,0 +1,58 @@
+import os
+
+# the service modules read these at import time
+os.environ.setdefault("MONGO_URL", "mongodb://test")
+os.environ.setdefault("MONGO_DB_NAME", "gomoku_test")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from backend.bench.service import drop_partial_indexes
+from backend.core import database
+from backend.core.indexes import ensure_indexes
+from backend.core.model.user import user_collection
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    """A fresh in-memory database behind every MongoAsyncClient of the process"""
+    database._clients[os.environ["MONGO_URL"]] = AsyncMongoMockClient()
+    await ensure_indexes()
+    await drop_partial_indexes()
+    yield database.MongoAsyncClient()
+    database._clients.pop(os.environ["MONGO_URL"], None)
+
+
+@pytest.fixture
+async def game_service(db):
+    from backend.game.service import GameService
+
+    service = GameService()
+    yield service
+    await service.stop()
+
+
+async def create_user(db, user_id: str, **fields) -> dict:
+    """Store a user record; pass rating=None for an account older than ratings"""
+    user = {
+        "id": user_id,
+        "email": f"{user_id}@example.com",
+        "name": user_id,
+        "hashed_pwd": "x",
+        "created_at": 0,
+        "updated_at": 0,
+        "rating": 1500.0,
+        "games_played": 0,
+        "wins": 0,
+        **fields
+    }
+    if user["rating"] is None:
+        for field in ("rating", "games_played", "wins"):
+            user.pop(field)
+    await db.insert_one(user_collection, user)
+    return user
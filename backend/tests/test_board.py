@@ -0,0 +1,126 @@
+import random
+import pytest
+from backend.bench.engine import BaselineGomoku, sample_board
+from backend.game.providers.board import GomokuBoard, is_alternating, pack_move, pack_moves, unpack_moves
+from backend.game.providers.gomoku import Gomoku
+
+gomoku = Gomoku()
+
+
+def line(x: int, y: int, dx: int, dy: int, length: int) -> list[list[int]]:
+    return [[x + i * dx, y + i * dy] for i in range(length)]
+
+
+def board_of(black: list, white: list = ()) -> dict:
+    return {"black": [list(c) for c in black], "white": [list(c) for c in white]}
+
+
+@pytest.mark.parametrize("dx, dy", [(0, 1), (1, 0), (1, 1), (1, -1)])
+def test_five_in_a_row_on_every_axis(dx, dy):
+    stones = line(7, 7, dx, dy, 5)
+    bitboard = GomokuBoard.from_dict(board_of(stones))
+    for x, y in stones:
+        assert bitboard.is_five_at("black", x, y)
+    assert GomokuBoard.has_five(bitboard.bits["black"])
+    assert gomoku.check_win(board_of(stones)) == "black"
+
+
+@pytest.mark.parametrize("dx, dy", [(0, 1), (1, 0), (1, 1), (1, -1)])
+def test_four_is_not_a_win(dx, dy):
+    stones = line(7, 7, dx, dy, 4)
+    bitboard = GomokuBoard.from_dict(board_of(stones))
+    assert not bitboard.is_five_at("black", 7, 7)
+    assert not GomokuBoard.has_five(bitboard.bits["black"])
+    assert gomoku.check_win(board_of(stones)) is None
+
+
+def test_runs_do_not_wrap_across_row_edges():
+    # (0, 16)..(0, 18) then (1, 0), (1, 1): adjacent bits only without the spare column
+    stones = [[0, 16], [0, 17], [0, 18], [1, 0], [1, 1]]
+    bitboard = GomokuBoard.from_dict(board_of(stones))
+    assert not GomokuBoard.has_five(bitboard.bits["black"])
+    assert not bitboard.is_five_at("black", 0, 18)
+
+
+def test_place_refuses_occupied_and_out_of_board_cells():
+    bitboard = GomokuBoard()
+    bitboard.place("black", 3, 3)
+    with pytest.raises(ValueError):
+        bitboard.place("white", 3, 3)
+    with pytest.raises(ValueError):
+        bitboard.place("white", 19, 0)
+
+
+def test_move_on_dict_and_bitboard_agree():
+    baseline = BaselineGomoku()
+    for seed in range(20):
+        board, _ = sample_board(0, seed)
+        bitboard = GomokuBoard()
+        cells = [(x, y) for x in range(Gomoku.BOARD_SIZE) for y in range(Gomoku.BOARD_SIZE)]
+        random.Random(seed).shuffle(cells)
+        for ply, (x, y) in enumerate(cells[:120]):
+            color = GomokuBoard.COLORS[ply % 2]
+            assert gomoku.is_valid_move(board, x, y) == baseline.is_valid_move(board, x, y)
+            _, dict_win = gomoku.move(board, color, x, y)
+            _, bit_win = gomoku.move(bitboard, color, x, y)
+            assert dict_win == bit_win
+            # the whole-board scan agrees; the baseline misses fives completed in the middle
+            assert gomoku.check_win(board) == (color if dict_win else None)
+            if dict_win:
+                break
+        assert bitboard.to_dict() == board
+
+
+def test_move_refuses_an_occupied_cell():
+    board = board_of([[4, 4]])
+    assert not gomoku.is_valid_move(board, 4, 4)
+    with pytest.raises(ValueError):
+        gomoku.move(board, "white", 4, 4)
+
+
+def test_check_win_many_matches_check_win():
+    boards = [sample_board(plies, seed)[0] for seed in range(10) for plies in (0, 9, 60, 150)]
+    boards.append(board_of(line(14, 0, 1, 1, 5), line(0, 0, 0, 1, 4)))
+    boards.append(board_of(line(0, 0, 1, 0, 4), line(18, 14, 0, 1, 5)))
+    assert gomoku.check_win_many(boards) == [gomoku.check_win(board) for board in boards]
+    assert gomoku.check_win_many(boards)[-2:] == ["black", "white"]
+
+
+def test_five_completed_in_the_middle_wins():
+    board = board_of([[5, 5], [5, 6], [5, 8], [5, 9]])
+    _, is_win = gomoku.move(board, "black", 5, 7)
+    assert is_win
+    assert not BaselineGomoku().check_win_with_last_move(board, "black", 5, 7)
+
+
+def test_five_mask_marks_the_start_of_each_run():
+    bitboard = GomokuBoard.from_dict(board_of(line(2, 3, 0, 1, 6)))
+    mask = GomokuBoard.five_mask(bitboard.bits["black"])
+    starts = {GomokuBoard.coords(idx) for idx in range(mask.bit_length()) if (mask >> idx) & 1}
+    assert starts == {(2, 3), (2, 4)}
+
+
+@pytest.mark.parametrize("plies", [0, 1, 2, 57, 361])
+def test_packed_moves_round_trip(plies):
+    board, _ = sample_board(plies, seed=plies)
+    data = pack_moves(board)
+    assert len(data) == 2 * plies
+    assert unpack_moves(data) == board
+    assert GomokuBoard.from_packed(data).to_dict() == board
+    assert gomoku.unpack_board(gomoku.compact_board(board)) == board
+
+
+def test_packed_moves_extend_by_concatenation():
+    board, empty = sample_board(10, seed=1)
+    x, y = empty[0]
+    extended = pack_moves(board) + pack_move(x, y)
+    board["black"].append([x, y])
+    assert unpack_moves(extended) == board
+
+
+def test_boards_whose_counts_do_not_alternate_are_not_packed():
+    board = board_of([[0, 0]], [[1, 1], [2, 2]])
+    assert not is_alternating(board)
+    assert not gomoku.can_pack_board(board)
+    with pytest.raises(ValueError):
+        pack_moves(board)
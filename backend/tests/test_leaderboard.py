@@ -0,0 +1,56 @@
+import pytest
+from fastapi import HTTPException
+from backend.tests.conftest import create_user
+from backend.user.service import UserService
+
+pytestmark = pytest.mark.anyio
+
+RATINGS = {"a": 1600.0, "b": 1550.0, "c": 1550.0, "d": 1550.0, "e": 1500.0, "f": 1500.0, "g": 1480.0}
+# competition ranking: tied players share the rank of the first of them
+RANKS = {"a": 1, "b": 2, "c": 2, "d": 2, "e": 5, "f": 5, "g": 7}
+
+
+@pytest.fixture
+async def users(db):
+    for user_id, rating in RATINGS.items():
+        await create_user(db, user_id, rating=rating, games_played=1)
+    await create_user(db, "legacy", rating=None)
+    return UserService()
+
+
+async def all_pages(users: UserService, limit: int) -> list[dict]:
+    page = await users.get_leaderboard(limit)
+    players = page["players"]
+    while page["next_after_id"] is not None:
+        page = await users.get_leaderboard(limit, page["next_after_rating"], page["next_after_id"])
+        players += page["players"]
+    return players
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 20])
+async def test_pages_list_every_rated_player_once_best_first(users, limit):
+    players = await all_pages(users, limit)
+
+    assert [player["id"] for player in players] == list(RATINGS)
+    assert {player["id"]: player["rank"] for player in players} == RANKS
+
+
+async def test_last_full_page_ends_with_an_empty_one(users):
+    page = await users.get_leaderboard(len(RATINGS))
+    assert page["next_after_id"] == "g"
+
+    page = await users.get_leaderboard(len(RATINGS), page["next_after_rating"], page["next_after_id"])
+    assert page == {"players": [], "next_after_rating": None, "next_after_id": None}
+
+
+async def test_get_rank_matches_the_leaderboard(users):
+    for user_id, rank in RANKS.items():
+        assert (await users.get_rank(user_id)).rank == rank
+
+
+async def test_players_without_a_rating_are_not_ranked(users):
+    with pytest.raises(HTTPException) as error:
+        await users.get_rank("legacy")
+    assert error.value.status_code == 404
+    with pytest.raises(HTTPException):
+        await users.get_rank("nobody")
@@ -0,0 +1,73 @@
+import pytest
+from backend.core.model.game import CreateGameRequest, GameType, GomokuMoveRequest, game_move_collection
+from backend.game.move_log import MoveConflict, MoveLog, MoveLogGap, SNAPSHOT_INTERVAL
+
+pytestmark = pytest.mark.anyio
+
+
+def event(ply: int) -> dict:
+    return {"ply": ply, "x": ply % 19, "y": ply // 19, "color": "black" if ply % 2 else "white", "ts": 0}
+
+
+def board_after(ply: int) -> dict:
+    board = {"black": [], "white": []}
+    for p in range(1, ply + 1):
+        board[event(p)["color"]].append([event(p)["x"], event(p)["y"]])
+    return board
+
+
+async def replayed(log: MoveLog, game_id: str, from_ply: int = 0) -> list[int]:
+    return [ply async for ply, _, _ in log.replay(game_id, from_ply)]
+
+
+async def test_retried_append_writes_only_new_plies(db):
+    log = MoveLog(db)
+    await log.append("g", [event(p) for p in range(1, 4)])
+    await log.append("g", [event(p) for p in range(1, 6)])
+
+    assert await replayed(log, "g") == [1, 2, 3, 4, 5]
+    with pytest.raises(MoveConflict):
+        await log.append("g", [{**event(5), "x": 18}])
+
+
+async def test_replay_starts_from_the_nearest_snapshot(db):
+    log = MoveLog(db)
+    last = 2 * SNAPSHOT_INTERVAL + 4
+    await log.append("g", [event(p) for p in range(1, last + 1)])
+    await log.snapshot_crossed("g", 0, last, board_after(last))
+
+    for from_ply in (0, SNAPSHOT_INTERVAL, SNAPSHOT_INTERVAL + 1, last):
+        assert await replayed(log, "g", from_ply) == list(range(max(from_ply, 1), last + 1))
+    boards = [board async for _, _, board in log.replay("g", last)]
+    assert boards == [board_after(last)]
+
+
+async def test_log_begun_late_replays_nothing(db):
+    log = MoveLog(db)
+    await log.append("g", [event(p) for p in range(7, 10)])
+
+    assert await replayed(log, "g") == []
+
+
+async def test_gap_in_the_log_is_an_error(db):
+    log = MoveLog(db)
+    await log.append("g", [event(p) for p in (1, 2, 3, 5, 6)])
+
+    with pytest.raises(MoveLogGap):
+        await replayed(log, "g")
+
+
+@pytest.mark.parametrize("missing", [1, 3, 6])
+async def test_game_replay_falls_back_to_the_stored_board(db, game_service, missing):
+    game = await game_service.create_game("p1", CreateGameRequest(type=GameType.GOMOKU), opponent_id="p2")
+    moves = [(0, 0), (5, 5), (0, 1), (5, 6), (0, 2), (5, 7)]
+    for ply, (x, y) in enumerate(moves):
+        await game_service.gomoku_move(("p1", "p2")[ply % 2], game.id, GomokuMoveRequest(x=x, y=y))
+    await game_service.cache.flush()
+    await db.db[game_move_collection].delete_one({"game_id": game.id, "ply": missing})
+
+    positions = [position async for position in game_service.replay_game(game.id)]
+
+    assert [position["ply"] for position in positions] == list(range(1, len(moves) + 1))
+    assert [(position["x"], position["y"]) for position in positions] == moves
+    assert positions[-1]["board"] == {"black": [[0, 0], [0, 1], [0, 2]], "white": [[5, 5], [5, 6], [5, 7]]}
@@ -0,0 +1,30 @@
+import pytest
+from backend.game.rating import K_ESTABLISHED, K_PROVISIONAL, PROVISIONAL_GAMES, elo_deltas, expected_score, k_factor
+
+
+def test_k_factor_drops_once_provisional_games_are_played():
+    assert k_factor(0) == K_PROVISIONAL
+    assert k_factor(PROVISIONAL_GAMES - 1) == K_PROVISIONAL
+    assert k_factor(PROVISIONAL_GAMES) == K_ESTABLISHED
+
+
+def test_equal_players_win_and_lose_half_of_k():
+    assert elo_deltas(1500, 0, 1500, 0, 1.0) == (K_PROVISIONAL / 2, -K_PROVISIONAL / 2)
+    games = PROVISIONAL_GAMES
+    assert elo_deltas(1500, games, 1500, games, 0.0) == (-K_ESTABLISHED / 2, K_ESTABLISHED / 2)
+    assert elo_deltas(1500, games, 1500, games, 0.5) == (0, 0)
+
+
+def test_upset_moves_ratings_more_than_expected_result():
+    favourite, underdog = 1800, 1400
+    assert expected_score(favourite, underdog) == pytest.approx(1 - expected_score(underdog, favourite))
+    expected_win, _ = elo_deltas(favourite, 50, underdog, 50, 1.0)
+    upset_loss, upset_win = elo_deltas(favourite, 50, underdog, 50, 0.0)
+    assert 0 < expected_win < upset_win
+    assert upset_loss == -upset_win
+
+
+def test_players_with_different_k_do_not_move_symmetrically():
+    new, settled = elo_deltas(1500, 0, 1500, PROVISIONAL_GAMES, 1.0)
+    assert new == K_PROVISIONAL / 2
+    assert settled == -K_ESTABLISHED / 2
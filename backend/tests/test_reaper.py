@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from backend.core.model.game import CreateGameRequest, GameType, GomokuMoveRequest, game_collection
+from backend.core.model.user import user_collection
+from backend.tests.conftest import create_user
+
+pytestmark = pytest.mark.anyio
+
+LONG_AGO = 1000
+
+
+async def age(db, services, game_ids: list[str]):
+    """Make games look idle since LONG_AGO, in the database and in every service's cache"""
+    for service in services:
+        await service.cache.flush()
+    await db.update_many(game_collection, {"id": {"$in": game_ids}}, {"updated_at": LONG_AGO})
+    for service in services:
+        for game_id in game_ids:
+            entry = service.cache.peek(game_id)
+            if entry is not None:
+                entry.game.updated_at = LONG_AGO
+
+
+async def started_game(game_service, p1: str = "p1", p2: str = "p2"):
+    """A game in which black has played once, so white is to move"""
+    game = await game_service.create_game(p1, CreateGameRequest(type=GameType.GOMOKU), opponent_id=p2)
+    await game_service.gomoku_move(p1, game.id, GomokuMoveRequest(x=9, y=9))
+    return game
+
+
+async def stored(db, game_id: str) -> dict:
+    return await db.find_one(game_collection, {"id": game_id})
+
+
+async def test_idle_lobby_expires(db, game_service):
+    lobby = await game_service.create_game("p1", CreateGameRequest(type=GameType.GOMOKU))
+    fresh = await game_service.create_game("p1", CreateGameRequest(type=GameType.GOMOKU))
+    await age(db, [game_service], [lobby.id])
+
+    assert await game_service.reaper.sweep() == {"expired": 1, "forfeited": 0}
+
+    game = await stored(db, lobby.id)
+    assert (game["is_active"], game["can_join"], game["data"]["end_reason"]) == (False, False, "expired")
+    assert (await stored(db, fresh.id))["is_active"]
+    assert lobby.search_id in game_service.search_ids.free
+
+
+async def test_player_to_move_forfeits_a_stale_game(db, game_service):
+    await create_user(db, "p1")
+    await create_user(db, "p2")
+    game = await started_game(game_service)
+    await age(db, [game_service], [game.id])
+
+    assert await game_service.reaper.sweep() == {"expired": 0, "forfeited": 1}
+
+    stored_game = await stored(db, game.id)
+    assert (stored_game["is_active"], stored_game["data"]["winner"], stored_game["data"]["end_reason"]) == (False, "black", "forfeit")
+    assert (await db.find_one(user_collection, {"id": "p1"}))["wins"] == 1
+    # the cached copy went with the game: late moves are refused
+    with pytest.raises(HTTPException):
+        await game_service.gomoku_move("p2", game.id, GomokuMoveRequest(x=0, y=0))
+
+
+async def test_unstored_move_keeps_a_game_alive(db, game_service):
+    game = await started_game(game_service)
+    await age(db, [game_service], [game.id])
+    # a move applied since, still waiting in the write-behind cache
+    await game_service.gomoku_move("p2", game.id, GomokuMoveRequest(x=0, y=0))
+
+    async def no_flush():
+        pass
+    game_service.cache.flush = no_flush
+
+    assert await game_service.reaper.sweep() == {"expired": 0, "forfeited": 0}
+    assert (await stored(db, game.id))["is_active"]
+
+
+async def test_concurrent_sweeps_end_each_game_once(db, game_service):
+    from backend.game.service import GameService
+
+    other = GameService()
+    try:
+        players = [f"u{i}" for i in range(8)]
+        for player in players:
+            await create_user(db, player)
+        games = [await started_game(game_service, p1, p2) for p1, p2 in zip(players[0::2], players[1::2])]
+        lobbies = [await game_service.create_game("u0", CreateGameRequest(type=GameType.GOMOKU)) for _ in range(3)]
+        await age(db, [game_service, other], [game.id for game in games + lobbies])
+        game_service.reaper.batch_size = other.reaper.batch_size = 2
+
+        results = await asyncio.gather(game_service.reaper.sweep(), other.reaper.sweep())
+
+        assert sum(result["forfeited"] for result in results) == len(games)
+        assert sum(result["expired"] for result in results) == len(lobbies)
+        # settled by exactly one worker each
+        for player in players:
+            assert (await db.find_one(user_collection, {"id": player}))["games_played"] == 1
+    finally:
+        await other.stop()
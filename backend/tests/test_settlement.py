@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from backend.core.model.game import CreateGameRequest, GameType, GomokuMoveRequest, game_collection
+from backend.core.model.user import user_collection
+from backend.game.rating import INITIAL_RATING, K_PROVISIONAL
+from backend.tests.conftest import create_user
+
+pytestmark = pytest.mark.anyio
+
+
+async def new_game(game_service, p1: str = "p1", p2: str = "p2"):
+    return await game_service.create_game(p1, CreateGameRequest(type=GameType.GOMOKU), opponent_id=p2)
+
+
+async def decide(db, game_id: str, winner: str):
+    await db.modify_one(game_collection, {"id": game_id}, {"$set": {"data.winner": winner, "is_active": False}})
+
+
+async def user(db, user_id: str) -> dict:
+    return await db.find_one(user_collection, {"id": user_id})
+
+
+async def test_winning_move_settles_both_players_once(db, game_service):
+    await create_user(db, "p1")
+    await create_user(db, "p2")
+    game = await new_game(game_service)
+    for y in range(4):
+        await game_service.gomoku_move("p1", game.id, GomokuMoveRequest(x=0, y=y))
+        await game_service.gomoku_move("p2", game.id, GomokuMoveRequest(x=1, y=y))
+    await game_service.gomoku_move("p1", game.id, GomokuMoveRequest(x=0, y=4))
+
+    # settled by the flush that stores the win
+    await game_service.cache.flush()
+    await asyncio.gather(*game_service._tasks)
+
+    winner, loser = await user(db, "p1"), await user(db, "p2")
+    assert (winner["rating"], winner["games_played"], winner["wins"]) == (INITIAL_RATING + K_PROVISIONAL / 2, 1, 1)
+    assert (loser["rating"], loser["games_played"], loser["wins"]) == (INITIAL_RATING - K_PROVISIONAL / 2, 1, 0)
+    assert game.search_id in game_service.search_ids.free
+
+    assert await game_service.settle_gomoku_game(game.id) is None
+    assert (await user(db, "p1"))["rating"] == winner["rating"]
+
+
+async def test_concurrent_settlements_rate_the_game_once(db, game_service):
+    await create_user(db, "p1")
+    await create_user(db, "p2")
+    game = await new_game(game_service)
+    await decide(db, game.id, "white")
+
+    results = await asyncio.gather(*(game_service.settle_gomoku_game(game.id) for _ in range(5)))
+
+    assert [result for result in results if result] == [{"p1": -K_PROVISIONAL / 2, "p2": K_PROVISIONAL / 2}]
+    assert (await user(db, "p2"))["games_played"] == 1
+
+
+async def test_undecided_game_is_not_settled(db, game_service):
+    await create_user(db, "p1")
+    await create_user(db, "p2")
+    game = await new_game(game_service)
+
+    assert await game_service.settle_gomoku_game(game.id) is None
+    assert (await user(db, "p1"))["games_played"] == 0
+
+
+async def test_legacy_player_starts_from_the_initial_rating(db, game_service):
+    await create_user(db, "p1")
+    await create_user(db, "legacy", rating=None)
+    game = await new_game(game_service, p2="legacy")
+    await decide(db, game.id, "white")
+
+    await game_service.settle_gomoku_game(game.id)
+
+    legacy = await user(db, "legacy")
+    assert (legacy["rating"], legacy["games_played"], legacy["wins"]) == (INITIAL_RATING + K_PROVISIONAL / 2, 1, 1)
+
+
+async def test_bot_game_frees_its_search_id_without_rating(db, game_service):
+    await create_user(db, "p1")
+    game = await game_service.create_game("p1", CreateGameRequest(type=GameType.GOMOKU, vs_bot=True))
+    await decide(db, game.id, "black")
+
+    assert await game_service.settle_gomoku_game(game.id) is None
+    assert game.search_id in game_service.search_ids.free
+    assert (await user(db, "p1"))["games_played"] == 0
@@ -1,55 +1,87 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Annotated
-from backend.core.model.user import CreateUserRequest, User
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Annotated, Optional
+from backend.core.model.user import CreateUserRequest, User, UserInfo, LeaderboardEntry
+from backend.core.model.response import Envelope, LeaderboardPage
+from backend.core.response import FastJSONResponse, envelope
 from backend.user.service import UserService
 from backend.auth.service import get_current_active_user
 
 
 router = APIRouter(
     prefix="/user",
-    tags=["user"]
+    tags=["user"],
+    default_response_class=FastJSONResponse
 )
 
 user_service = UserService()
 
 # Public endpoint - no JWT token required
-@router.post("/create")
-async def create_user(request: CreateUserRequest) -> dict:
+@router.post("/create", response_model=Envelope[UserInfo])
+async def create_user(request: CreateUserRequest) -> FastJSONResponse:
     """
     Create user - public endpoint, no authentication required
     Anyone can register a new account
     """
     try:
         user_info = await user_service.create_user(request)
-        return {
-            "status": 1,
-            "data": user_info.model_dump(),
-            "message": "User registered successfully"
-        }
+        return envelope(user_info, "User registered successfully")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Public endpoint - no JWT token required
+@router.get("/leaderboard", response_model=Envelope[LeaderboardPage])
+async def get_leaderboard(
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    after_rating: Optional[float] = None,
+    after_id: Optional[str] = None
+) -> FastJSONResponse:
+    """
+    Get the leaderboard - public endpoint, no authentication required
+    Rated players best first, a page at a time via next_after_rating and next_after_id
+    """
+    try:
+        page = await user_service.get_leaderboard(limit, after_rating, after_id)
+        return envelope(page, "Successfully retrieved leaderboard")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Public endpoint - no JWT token required
+@router.get("/{user_id}/rank", response_model=Envelope[LeaderboardEntry])
+async def get_user_rank(user_id: str) -> FastJSONResponse:
+    """
+    Get the rank of a player - public endpoint, no authentication required
+    """
+    try:
+        entry = await user_service.get_rank(user_id)
+        return envelope(entry, "Successfully retrieved user rank")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Protected endpoint - JWT token required
-@router.get("/me")
+@router.get("/me", response_model=Envelope[UserInfo])
 async def get_current_user_info(
     current_user: Annotated[User, Depends(get_current_active_user)]
-) -> dict:
+) -> FastJSONResponse:
     """
     Get current user info - requires JWT authentication
     Returns complete information of the authenticated user
     """
     try:
-        return {
-            "status": 1,
-            "data": {
+        return envelope(
+            {
                 "id": current_user.id,
                 "email": current_user.email,
                 "name": current_user.name,
                 "created_at": current_user.created_at,
                 "updated_at": current_user.updated_at,
-                "is_active": current_user.is_active
+                "is_active": current_user.is_active,
+                "rating": current_user.rating,
+                "games_played": current_user.games_played,
+                "wins": current_user.wins
             },
-            "message": f"Welcome, {current_user.name}!"
-        }
+            f"Welcome, {current_user.name}!"
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
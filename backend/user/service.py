@@ -1,8 +1,8 @@
 from backend.core.database import MongoAsyncClient
-from backend.core.model.user import user_collection, User, CreateUserRequest, UserInfo
+from backend.core.model.user import user_collection, User, CreateUserRequest, UserInfo, LeaderboardEntry, LEADERBOARD_PROJECTION, RATED_FILTER
 from fastapi import HTTPException
 import uuid
-from backend.core.model.auth import pwd_context
+from backend.auth.hashing import password_hasher
 from datetime import datetime as dt, timezone as tz
 
 class UserService:
@@ -23,7 +23,7 @@ class UserService:
             id=str(uuid.uuid4())[:8],
             email=request.email,
             name=request.name,
-            hashed_pwd=pwd_context.hash(request.pwd),
+            hashed_pwd=await password_hasher.hash(request.pwd),
             created_at=int(dt.now(tz.utc).timestamp()),
             updated_at=int(dt.now(tz.utc).timestamp()),
             is_active=True
@@ -35,7 +35,10 @@ class UserService:
             name=user.name,
             created_at=user.created_at,
             updated_at=user.updated_at,
-            is_active=user.is_active
+            is_active=user.is_active,
+            rating=user.rating,
+            games_played=user.games_played,
+            wins=user.wins
         )
     
     async def get_user_info(self, user_id: str) -> UserInfo:
@@ -49,5 +52,71 @@ class UserService:
             name=user.name,
             created_at=user.created_at,
             updated_at=user.updated_at,
-            is_active=user.is_active
-        )
\ No newline at end of file
+            is_active=user.is_active,
+            rating=user.rating,
+            games_played=user.games_played,
+            wins=user.wins
+        )
+
+    async def get_leaderboard(self, limit: int = 20, after_rating: float | None = None, after_id: str | None = None) -> dict:
+        """
+        One page of rated players, best first, plus the keyset cursor of the
+        next page: the page is a range scan of the (rating, id) index
+        starting after the last player of the previous one.
+        """
+        filter = RATED_FILTER
+        if after_rating is not None and after_id is not None:
+            filter = {"$or": [
+                {"rating": {"$lt": after_rating}},
+                {"rating": after_rating, "id": {"$gt": after_id}}
+            ]}
+        players = await self.db.find_many(
+            user_collection,
+            filter,
+            LEADERBOARD_PROJECTION,
+            sort=[("rating", -1), ("id", 1)],
+            limit=limit
+        )
+        if not players:
+            return {"players": [], "next_after_rating": None, "next_after_id": None}
+
+        # competition ranking: ties share the rank of the first of them
+        first = players[0]
+        above = await self.db.count(user_collection, {"rating": {"$gt": first["rating"]}})
+        # players tied with the first one but listed on earlier pages
+        tied_before = await self.db.count(user_collection, {"rating": first["rating"], "id": {"$lt": first["id"]}})
+        rank = above + 1
+        entries = []
+        for position, player in enumerate(players):
+            if position and player["rating"] < players[position - 1]["rating"]:
+                rank = above + tied_before + position + 1
+            entries.append(LeaderboardEntry(rank=rank, **player).model_dump())
+
+        last = players[-1]
+        more = len(players) == limit
+        return {
+            "players": entries,
+            "next_after_rating": last["rating"] if more else None,
+            "next_after_id": last["id"] if more else None
+        }
+
+    async def get_rank(self, user_id: str) -> LeaderboardEntry:
+        """
+        Rank of one rated player: a count over the rating index of the
+        players rated above, as on the leaderboard
+        """
+        user = await self.db.find_one(user_collection, {"id": user_id})
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        if "rating" not in user:
+            raise HTTPException(status_code=404, detail="User has no rating yet")
+        user = User(**user)
+        rank = await self.db.count(user_collection, {"rating": {"$gt": user.rating}}) + 1
+        return LeaderboardEntry(
+            rank=rank,
+            id=user.id,
+            name=user.name,
+            rating=user.rating,
+            games_played=user.games_played,
+            wins=user.wins
+        )